@@ -0,0 +1,184 @@
+"""
+Static footprint analysis of an assembled program.
+
+Reports how much of ROM the program fills, how much of RAM its variables
+use before running into the screen at SCREEN, how big the code between
+each pair of labels is, and how often each label and variable is
+referenced. The largest regions are where shrinking the program pays off
+most.
+
+    python hack_analysis.py translation_target/Pong.asm
+    python hack_analysis.py translation_target/Pong.asm --json report.json --top 20
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+
+from hack_assembler import (
+    A_INSTRUCTION,
+    SymbolTable,
+    allocate_variables,
+    lex_buffer,
+    parse_clean_lines,
+    read_source,
+    resolve_labels,
+    symbol_table_dict_original,
+)
+
+rom_size = 32768
+# variables are allocated from 16 up, and run into the screen memory map here
+first_variable_address = 16
+screen_address = symbol_table_dict_original["SCREEN"]
+
+# name of the region before the first label
+start_region = "<start>"
+
+
+def analyze(source: bytes, name: str = "<source>", top: int = 10) -> dict:
+    """Analyze a program's ROM and RAM footprint.
+
+    Args:
+        source (bytes): the program's .asm source
+        name (str): name to report the program by
+        top (int): how many of the largest regions to list
+
+    Returns:
+        dict: ROM and RAM usage, every label region, label and variable
+            reference counts and the largest regions, ready for json.dump
+    """
+    program = parse_clean_lines(lex_buffer(source))
+    symbol_table = SymbolTable(symbol_table_dict_original)
+    instructions = resolve_labels(program, symbol_table)
+    labels = {
+        symbol: address
+        for symbol, address in symbol_table.items()
+        if symbol not in symbol_table_dict_original
+    }
+    allocate_variables(instructions, symbol_table)
+    variables = {
+        symbol: address
+        for symbol, address in symbol_table.items()
+        if symbol not in symbol_table_dict_original and symbol not in labels
+    }
+
+    references = Counter(inst.symbol for inst in instructions if inst.symbol is not None)
+
+    # a region runs from a label to the next label at a higher address- labels at the
+    # same address share one, named by the first of them
+    region_starts = [(0, start_region)]
+    for label, address in labels.items():
+        if address > region_starts[-1][0]:
+            region_starts.append((address, label))
+        elif address == 0 and region_starts[-1][1] == start_region:
+            region_starts[-1] = (0, label)
+
+    regions = []
+    for index, (start, label) in enumerate(region_starts):
+        end = region_starts[index + 1][0] if index + 1 < len(region_starts) else len(instructions)
+        if end > start or label != start_region:
+            regions.append({"label": label, "start": start, "instructions": end - start})
+
+    instruction_count = len(instructions)
+    a_count = sum(1 for inst in instructions if inst.kind == A_INSTRUCTION)
+    last_variable = max(variables.values(), default=first_variable_address - 1)
+
+    return {
+        "name": name,
+        "rom": {
+            "instructions": instruction_count,
+            "a_instructions": a_count,
+            "c_instructions": instruction_count - a_count,
+            "size": rom_size,
+            "free": rom_size - instruction_count,
+            "used_fraction": instruction_count / rom_size,
+        },
+        "ram": {
+            "variables": len(variables),
+            "first_variable": first_variable_address,
+            "last_variable": last_variable if variables else None,
+            "screen": screen_address,
+            "free_before_screen": screen_address - last_variable - 1,
+        },
+        "regions": regions,
+        "largest_regions": sorted(regions, key=lambda region: -region["instructions"])[:top],
+        "label_references": {label: references[label] for label in labels},
+        "variables": {
+            symbol: {"address": address, "references": references[symbol]}
+            for symbol, address in variables.items()
+        },
+    }
+
+
+def format_report(report: dict, top: int = 10) -> str:
+    """Render an analyze report as text."""
+    rom = report["rom"]
+    ram = report["ram"]
+    label_references = report["label_references"]
+
+    if ram["variables"]:
+        variable_range = (
+            f"{ram['variables']} variables at {ram['first_variable']}-{ram['last_variable']}"
+        )
+    else:
+        variable_range = "no variables"
+
+    lines = [
+        report["name"],
+        f"ROM: {rom['instructions']} of {rom['size']} instructions "
+        f"({rom['used_fraction']:.1%}), {rom['free']} free- "
+        f"{rom['a_instructions']} a-instructions, {rom['c_instructions']} c-instructions",
+        f"RAM: {variable_range}, "
+        f"{ram['free_before_screen']} words free below SCREEN ({ram['screen']})",
+        f"{len(report['regions'])} label regions, {len(label_references)} labels",
+        "",
+        "Largest regions:",
+    ]
+    for region in report["largest_regions"]:
+        lines.append(
+            f"  {region['instructions']:>7}  {region['label']} (from {region['start']}, "
+            f"{label_references.get(region['label'], 0)} references)"
+        )
+
+    lines += ["", "Most referenced labels:"]
+    for label, count in sorted(label_references.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"  {count:>7}  {label}")
+
+    lines += ["", "Variables:"]
+    for symbol, variable in report["variables"].items():
+        lines.append(
+            f"  {variable['address']:>7}  {symbol} ({variable['references']} references)"
+        )
+
+    return "\n".join(lines)
+
+
+def cli(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Report the ROM and RAM footprint of a Hack assembly program."
+    )
+    parser.add_argument("path", help="path to the .asm source, or - for standard input")
+    parser.add_argument("--top", type=int, default=10, help="how many regions and labels to list")
+    parser.add_argument("--json", metavar="FILE", help="also write the report as JSON, - for stdout")
+    args = parser.parse_args(argv)
+
+    name = "<stdin>" if args.path == "-" else os.path.basename(args.path)
+    report = analyze(read_source(args.path), name, args.top)
+
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return 0
+
+    print(format_report(report, args.top))
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
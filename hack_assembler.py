@@ -3,14 +3,49 @@ Accepts argument of path to Prog.asm, containing a valid Hack Assembly Language
 Translates from Hack Assembly Language to Hack binary code.
 Stores resulting binary in Prog.hack, in the same folder as the source,
 overwriting if necessary.
+
+Pass - as the path to read the program from standard input, and -o to
+choose where the binary goes (- for standard output).
+
+Pass --stream to assemble in two passes over the file without holding the
+program in memory, or --batch to assemble many files across a process pool,
+each into its own <name>.hack. --format rom-le/rom-be writes a packed
+image of 16-bit words instead of text, 2 bytes per instruction.
 """
 
-import re
-import sys
+# annotations stay unevaluated, so the names they use only need importing for type checkers
+from __future__ import annotations
+
+# started before anything else is imported, so --self-test-timing can report the import cost
+import time
+
+import_started = time.perf_counter()
+
+# argparse, glob, json, typing (which imports re), contextlib, functools, concurrent.futures
+# and hack_cache cost more to import than assembling a small program takes, so they're
+# imported where they're used instead
+from array import array
 import os
+import sys
+from itertools import chain, islice
+
+# type checkers treat any name TYPE_CHECKING as true- typing.TYPE_CHECKING would import typing
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    import argparse
+    from typing import BinaryIO, Callable, Iterable, Iterator
+
+    from hack_cache import AssemblyCache
+
+# part of every cache key, so bump it whenever the output for a given source could change
+__version__ = "1.1.0"
 
 # Constants- rule dicts representing tables
 
+# ASCII whitespace other than line breaks- everything str.split() and re's \s delete within
+# a line, \x1c to \x1f included. Deleted from a whole buffer at once
+inline_whitespace = b" \t\f\v\x1c\x1d\x1e\x1f"
+
 destination_dict = {
     None: "000",
     "M": "001",
@@ -72,6 +107,71 @@ comp_dict = {
     "D|M": "1010101",
 }
 
+# Integer forms of the tables above, shifted into their bit positions so an
+# encoded c-instruction is just the OR of the prefix and three lookups.
+# 1 1 1 a c1 c2 c3 c4 c5 c6 d1 d2 d3 j1 j2 j3
+# Written out rather than built from the tables above, so importing does no work- the
+# shifts are folded into constants when the module is compiled.
+c_instruction_prefix = 0b111 << 13
+comp_bits_dict = {
+    "0": 0b0101010 << 6,
+    "1": 0b0111111 << 6,
+    "-1": 0b0111010 << 6,
+    "D": 0b0001100 << 6,
+    "A": 0b0110000 << 6,
+    "!D": 0b0001101 << 6,
+    "!A": 0b0110001 << 6,
+    "-D": 0b0001111 << 6,
+    "-A": 0b0110011 << 6,
+    "D+1": 0b0011111 << 6,
+    "A+1": 0b0110111 << 6,
+    "D-1": 0b0001110 << 6,
+    "A-1": 0b0110010 << 6,
+    "D+A": 0b0000010 << 6,
+    "D-A": 0b0010011 << 6,
+    "A-D": 0b0000111 << 6,
+    "D&A": 0b0000000 << 6,
+    "D|A": 0b0010101 << 6,
+    "M": 0b1110000 << 6,
+    "!M": 0b1110001 << 6,
+    "-M": 0b1110011 << 6,
+    "M+1": 0b1110111 << 6,
+    "M-1": 0b1110010 << 6,
+    "D+M": 0b1000010 << 6,
+    "D-M": 0b1010011 << 6,
+    "M-D": 0b1000111 << 6,
+    "D&M": 0b1000000 << 6,
+    "D|M": 0b1010101 << 6,
+}
+destination_bits_dict = {
+    None: 0b000 << 3,
+    "M": 0b001 << 3,
+    "D": 0b010 << 3,
+    "DM": 0b011 << 3,
+    "MD": 0b011 << 3,
+    "A": 0b100 << 3,
+    "AM": 0b101 << 3,
+    "MA": 0b101 << 3,
+    "AD": 0b110 << 3,
+    "DA": 0b110 << 3,
+    "ADM": 0b111 << 3,
+    "AMD": 0b111 << 3,
+    "MDA": 0b111 << 3,
+    "MAD": 0b111 << 3,
+    "DAM": 0b111 << 3,
+    "DMA": 0b111 << 3,
+}
+jump_bits_dict = {
+    None: 0b000,
+    "JGT": 0b001,
+    "JEQ": 0b010,
+    "JGE": 0b011,
+    "JLT": 0b100,
+    "JNE": 0b101,
+    "JLE": 0b110,
+    "JMP": 0b111,
+}
+
 # Symbol Table is below- will be dynamically added to
 # during label and variable handling
 # see pg. 82 in book for specification
@@ -105,34 +205,100 @@ symbol_table_dict_original = {
     "KBD": 24576,
 }
 
+# largest value an a-instruction can hold- its first bit is always 0, so constants,
+# labels and variables all have to fit in 15 bits
+max_constant = 0x7FFF
 
-def a_instruction(instruction: str, symbol_table_local: dict):
-    """If line is an a-instruction, call this function.
+
+def out_of_range_error(text: str, line_number: int | None = None) -> ValueError:
+    """The error for an a-instruction whose value doesn't fit in 15 bits, the same on every path."""
+    message = f"a-instruction '{text}' is out of range, addresses must fit in 15 bits"
+    if line_number is not None:
+        message = f"line {line_number}: {message}"
+    return ValueError(message)
+
+
+def encode_a_instruction(instruction: str, symbol_table_local: dict) -> int:
+    """Encode an a-instruction as an integer word.
 
     Args:
-        instruction (str): individual instruction to encode
+        instruction (str): individual instruction to encode, e.g. "@21" or "@LOOP"
         symbol_table_local (dict): current symbol table, using local to avoid global state issues
 
     Returns:
-        string: 16-bit machine code representation of instruction
+        int: 16-bit machine code word, first bit always 0
+
+    Raises:
+        ValueError: if the constant or symbol's value doesn't fit in 15 bits
     """
-    # 1- Set first bit to 0
-    # 2- if command is a decimal value, translate to binary using 15 bits
-    # 3- if command is a symbol, apply its translation using symbol table
-    #    (this handles applying all label and preset symbols)
     command = instruction[1:]
 
-    if not command.isdecimal():
+    if command.isdecimal():
+        word = int(command)
+    else:
         try:
-            command = symbol_table_local[command]
-            # fetch decimal encoding
+            word = symbol_table_local[command]
         except KeyError:
             raise KeyError(
                 f"{command} not found in symbol table, a-instruction '{instruction}' can't be translated"
             )
 
-    binary_command = "{0:015b}".format(int(command))
-    return f"0{binary_command}"
+    if word > max_constant:
+        raise out_of_range_error(instruction)
+    return word
+
+
+def encode_c_instruction(instruction: str) -> int:
+    """Encode a c-instruction as an integer word.
+
+    Args:
+        instruction (str): individual instruction to encode, e.g. "D=D+A" or "0;JMP"
+
+    Returns:
+        int: 16-bit machine code word, built by OR-ing the field tables together
+    """
+    # syntax:
+    # dest = comp ; jump
+    dest_command, equals, comp_and_jump = instruction.partition("=")
+    if not equals:
+        comp_and_jump = dest_command
+        dest_command = None
+
+    comp_command, semicolon, jump_command = comp_and_jump.partition(";")
+    if not semicolon:
+        if not equals:
+            raise ValueError(
+                f"c-instruction '{instruction}' lacks required syntax markers of either '=' or ';', cannot be assembled"
+            )
+        jump_command = None
+
+    try:
+        dest_bits = destination_bits_dict[dest_command]
+    except KeyError:
+        raise KeyError(f"{dest_command} not found in destination table")
+    try:
+        comp_bits = comp_bits_dict[comp_command]
+    except KeyError:
+        raise KeyError(f"{comp_command} not found in computation dict")
+    try:
+        jump_bits = jump_bits_dict[jump_command]
+    except KeyError:
+        raise KeyError(f"{jump_command} not found in jump dict")
+
+    return c_instruction_prefix | comp_bits | dest_bits | jump_bits
+
+
+def a_instruction(instruction: str, symbol_table_local: dict):
+    """If line is an a-instruction, call this function.
+
+    Args:
+        instruction (str): individual instruction to encode
+        symbol_table_local (dict): current symbol table, using local to avoid global state issues
+
+    Returns:
+        string: 16-bit machine code representation of instruction
+    """
+    return word_text_table[encode_a_instruction(instruction, symbol_table_local)]
 
 
 def destination(dest_command: str):
@@ -160,163 +326,1243 @@ def c_instruction(instruction: str):
     """
     If line is an c-instruction, call this function. Outputs 16-bit machine code representation.
     """
-    # separate into "computation", "destination", and "jump" fields
-    #
-    # syntax:
-    # dest = comp ; jump
-    #
-    # encode each field separately
-    # recombine them in order
-    # 1 1 1 a c1 c2 c3 c4 c5 c6 d1 d2 d3 j1 j2 j3
-    # ("a" is part of computation fields)
+    return word_text_table[encode_c_instruction(instruction)]
 
-    # default values
-    dest_code = "000"
-    comp_code = "0000000"
-    jump_code = "000"
 
-    # case 1: dest = comp ; jump
-    if ("=" in instruction) and (";" in instruction):
-        instruction_list = re.split("=|;", instruction)
+# kinds of parsed line
+A_INSTRUCTION = "A"
+C_INSTRUCTION = "C"
+LABEL = "L"
 
-        dest_code = destination(instruction_list[0])
-        comp_code = computation(instruction_list[1])
-        jump_code = jump(instruction_list[2])
 
-    # case 2: dest = comp
-    elif ("=" in instruction) and (";" not in instruction):
-        instruction_list = re.split("=", instruction)
+class Instruction:
+    """One parsed line of a program- the form every stage after parsing works on.
 
-        dest_code = destination(instruction_list[0])
-        comp_code = computation(instruction_list[1])
+    a-instructions hold the word of a decimal constant, or the symbol still to be
+    looked up. c-instructions hold their whole encoded word, and labels hold their
+    name in symbol. text and line_number keep the cleaned source and the 1-based
+    line it came from, for listings and error messages.
+    """
 
-    # case 3: comp ; jump
-    elif (";" in instruction) and ("=" not in instruction):
-        instruction_list = re.split(";", instruction)
+    __slots__ = ("kind", "symbol", "word", "text", "line_number")
 
-        comp_code = computation(instruction_list[0])
-        jump_code = jump(instruction_list[1])
+    def __init__(
+        self,
+        kind: str,
+        text: str,
+        line_number: int = 0,
+        symbol: str | None = None,
+        word: int | None = None,
+    ):
+        self.kind = kind
+        self.text = text
+        self.line_number = line_number
+        self.symbol = symbol
+        self.word = word
 
-    else:
-        raise ValueError(
-            f"c-instruction '{instruction}' lacks required syntax markers of either '=' or ';', cannot be assembled"
-        )
+    def __repr__(self) -> str:
+        return f"Instruction({self.kind!r}, {self.text!r}, line {self.line_number})"
 
-    result = f"111{comp_code}{dest_code}{jump_code}"
 
-    # return final binary as string
-    return result
+def parse_line(
+    text: str, line_number: int = 0, c_words: dict[str, int] | None = None
+) -> Instruction:
+    """Parse one cleaned, non-empty line.
+
+    Args:
+        text (str): the line with comments and whitespace already stripped
+        line_number (int): 1-based source line, used in error messages
+        c_words (dict[str, int], optional): c-instruction encodings to reuse and add to
+
+    Returns:
+        Instruction: the parsed line- c-instructions are fully encoded here
+    """
+    first = text[0]
+
+    if first == "@":
+        command = text[1:]
+        if command.isdecimal():
+            word = int(command)
+            if word > max_constant:
+                raise out_of_range_error(text, line_number)
+            return Instruction(A_INSTRUCTION, text, line_number, word=word)
+        return Instruction(A_INSTRUCTION, text, line_number, symbol=command)
+
+    if first == "(":
+        return Instruction(LABEL, text, line_number, symbol=text.strip("()"))
+
+    word = c_words.get(text) if c_words is not None else None
+    if word is None:
+        try:
+            word = encode_c_instruction(text)
+        except (KeyError, ValueError) as error:
+            raise type(error)(f"line {line_number}: {error.args[0]}") from None
+        if c_words is not None:
+            c_words[text] = word
+
+    return Instruction(C_INSTRUCTION, text, line_number, word=word)
+
+
+def split_lines(text: str) -> list[str]:
+    """Split text where reading it with universal newlines would- at "\n", "\r\n" and a lone "\r".
+
+    Unlike str.splitlines, characters such as \x1c or U+2028 don't end a line.
+    They're whitespace, deleted by clean_line.
+    """
+    return text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+
+
+def count_lines(source: bytes) -> int:
+    """Lines in a source as split_lines reads them, without the empty one after a final break."""
+    breaks = source.count(b"\n") + source.count(b"\r") - source.count(b"\r\n")
+    return breaks + (bool(source) and not source.endswith((b"\n", b"\r")))
+
+
+def clean_line(line: str) -> str:
+    """Strip a comment and all whitespace from one line."""
+    # split() with no separator splits on any run of whitespace- strip only trims the ends
+    return "".join(line.partition("//")[0].split())
+
+
+def lex_buffer(buffer: bytes) -> list[str]:
+    """Strip comments and whitespace from a whole source buffer.
+
+    Cleans exactly like clean_line on each line read with universal newlines,
+    which is what the original line-by-line re.sub did: "\r\n" and a lone "\r"
+    end a line too, comments are cut before whitespace is deleted (so "/ /"
+    isn't one), and every whitespace character goes.
+
+    ASCII sources are cleaned with whole-buffer bytes operations- comments cut
+    from the lines that have one, then whitespace deleted in one bytes.translate
+    call. Anything else is decoded and cleaned line by line by clean_line, since
+    Unicode whitespace like U+00A0 has no single-byte form to translate away.
+
+    Args:
+        buffer (bytes): the raw bytes of a program
+
+    Returns:
+        list[str]: the cleaned text of every source line, empty where nothing was left-
+            the text of line n is at index n - 1
+    """
+    if not buffer.isascii():
+        return list(map(clean_line, split_lines(buffer.decode())))
+
+    if b"\r" in buffer:
+        buffer = buffer.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+    comment = buffer.find(b"//")
+    if comment != -1:
+        # cut each comment up to its line break, visiting only the lines that have one
+        pieces = []
+        position = 0
+        while comment != -1:
+            pieces.append(buffer[position:comment])
+            position = buffer.find(b"\n", comment)
+            if position == -1:
+                break
+            comment = buffer.find(b"//", position)
+        else:
+            pieces.append(buffer[position:])
+        buffer = b"".join(pieces)
+
+    return buffer.translate(None, inline_whitespace).decode().split("\n")
+
+
+def parse_clean_lines(
+    clean_lines: Iterable[str],
+    c_words: dict[str, int] | None = None,
+    first_line_number: int = 1,
+) -> list[Instruction]:
+    """Parse already cleaned lines, so no later stage looks at the text again.
+
+    Compiler output repeats the same handful of c-instructions over and over,
+    so each distinct c-instruction is only encoded once per call.
+
+    Args:
+        clean_lines (Iterable[str]): one cleaned line per source line- empty lines are skipped
+            but still counted, so line numbers stay right
+        c_words (dict[str, int], optional): c-instruction encodings to reuse and add to,
+            so they can be shared between calls- a fresh one per call by default
+        first_line_number (int): line number of the first line given
+
+    Returns:
+        list[Instruction]: one record per instruction or label, in program order
+    """
+    if c_words is None:
+        c_words = {}
+
+    program = []
+    append = program.append
+
+    # parse_line inlined- this loop runs once per source line
+    for line_number, text in enumerate(clean_lines, first_line_number):
+        if not text:
+            continue
+
+        first = text[0]
+        if first == "@":
+            command = text[1:]
+            if command.isdecimal():
+                word = int(command)
+                if word > max_constant:
+                    raise out_of_range_error(text, line_number)
+                append(Instruction(A_INSTRUCTION, text, line_number, None, word))
+            else:
+                append(Instruction(A_INSTRUCTION, text, line_number, command))
+        elif first == "(":
+            append(Instruction(LABEL, text, line_number, text.strip("()")))
+        else:
+            word = c_words.get(text)
+            if word is None:
+                word = parse_line(text, line_number, c_words).word
+            append(Instruction(C_INSTRUCTION, text, line_number, None, word))
+
+    return program
+
+
+def parse_program(
+    source_lines: Iterable[str],
+    c_words: dict[str, int] | None = None,
+    first_line_number: int = 1,
+) -> list[Instruction]:
+    """Clean and parse source lines- see parse_clean_lines.
+
+    Cleans line by line, for sources that only come as lines. Use lex_buffer and
+    parse_clean_lines directly when the whole source is at hand as bytes.
+    """
+    return parse_clean_lines(map(clean_line, source_lines), c_words, first_line_number)
+
+
+def encode_instructions(instructions: list[Instruction], symbol_table: dict) -> list[int]:
+    """Encode a label-free instruction list into integer words.
+
+    Args:
+        instructions (list[Instruction]): parsed instructions, labels already removed
+        symbol_table (dict): symbol table holding the labels- pass a SymbolTable
+            to have variables allocated as they are first seen
+
+    Returns:
+        list[int]: one 16-bit word per instruction
+
+    Raises:
+        ValueError: if a label or variable used by an a-instruction doesn't fit in 15 bits-
+            decimal constants are already checked when they're parsed
+    """
+    try:
+        words = [
+            inst.word if inst.word is not None else symbol_table[inst.symbol]
+            for inst in instructions
+        ]
+    except KeyError as error:
+        symbol = error.args[0]
+        raise KeyError(
+            f"{symbol} not found in symbol table, a-instruction '@{symbol}' can't be translated"
+        ) from None
+
+    check_symbol_range(instructions, symbol_table)
+    return words
+
+
+def check_symbol_range(instructions: list[Instruction], symbol_table: dict[str, int]):
+    """Raise for the first a-instruction whose symbol's value doesn't fit in 15 bits.
+
+    Only programs too big for ROM have such symbols, so this is a single max()
+    over the table unless one of them is there.
+    """
+    if max(symbol_table.values(), default=0) <= max_constant:
+        return
+
+    for inst in instructions:
+        if inst.word is None and symbol_table[inst.symbol] > max_constant:
+            raise out_of_range_error(inst.text, inst.line_number)
+
+
+def allocate_variables(instructions: list[Instruction], symbol_table: "SymbolTable"):
+    """Give every variable its address up front, in program order.
+
+    Encoding normally allocates variables lazily, as it walks the program in
+    order. Allocating them first gives the same addresses, for callers that
+    need the finished table before, or without, encoding.
+    """
+    for inst in instructions:
+        if inst.word is None:
+            symbol_table[inst.symbol]
+
+
+def load_numpy():
+    """Import NumPy if it's installed, otherwise return None so callers can fall back."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def encode_instructions_numpy(instructions: list[Instruction], symbol_table: dict):
+    """Encode a program with the a-instruction words built in bulk by NumPy.
+
+    Symbols still have to be looked up one at a time (in program order, so
+    lazily allocated variables get the usual addresses), but range checking
+    and building the words happen in single array operations. The
+    a-instruction and c-instruction words are then scattered back into
+    program order.
+
+    Returns:
+        numpy.ndarray: one uint16 word per instruction
+    """
+    numpy = load_numpy()
+
+    a_indexes = []
+    a_values = []
+    c_indexes = []
+    c_values = []
+
+    for index, inst in enumerate(instructions):
+        if inst.kind == A_INSTRUCTION:
+            a_indexes.append(index)
+            a_values.append(inst.word if inst.word is not None else symbol_table[inst.symbol])
+        else:
+            c_indexes.append(index)
+            c_values.append(inst.word)
+
+    a_array = numpy.array(a_values, dtype=numpy.int64)
+    out_of_range = numpy.flatnonzero(a_array > max_constant)
+    if out_of_range.size:
+        inst = instructions[a_indexes[out_of_range[0]]]
+        raise out_of_range_error(inst.text, inst.line_number)
+
+    words = numpy.empty(len(instructions), dtype=numpy.uint16)
+    words[a_indexes] = a_array
+    words[c_indexes] = c_values
+
+    return words
+
+
+def render_words_numpy(words) -> list[str]:
+    """Render a uint16 array into .hack lines by unpacking every bit at once."""
+    numpy = load_numpy()
+
+    # big-endian bytes so unpackbits yields the most significant bit first
+    bits = numpy.unpackbits(words.astype(">u2").view(numpy.uint8)).reshape(-1, 16)
+    characters = numpy.empty((len(words), 17), dtype=numpy.uint8)
+    characters[:, :16] = bits + ord("0")
+    characters[:, 16] = ord("\n")
+
+    return characters.tobytes().decode("ascii").splitlines()
+
+
+class WordTextTable(dict):
+    """Memo of the .hack text of each word, filled in as words are first rendered.
+
+    Programs reuse a small set of words over and over- the same handful of
+    addresses like @SP and @R13 and the same c-instructions- so most words
+    are rendered by a single lookup. There are only 2^16 words, which bounds
+    the table. Anything wider would be a 17-character line, so it raises.
+    """
+
+    def __missing__(self, word: int) -> str:
+        if word >> 16 or word < 0:
+            raise ValueError(f"word {word} doesn't fit in 16 bits")
+        text = self[word] = format(word, "016b")
+        return text
+
+
+# shared by every program assembled in this process- batch workers and the server included
+word_text_table = WordTextTable()
+
+
+def render_words(words: list[int]) -> list[str]:
+    """Turn integer words into the 16-character strings used by the .hack format."""
+    return list(map(word_text_table.__getitem__, words))
+
+
+def read_source(path: str) -> bytes:
+    """Read a source file, or standard input when path is "-"."""
+    if path == "-":
+        return sys.stdin.buffer.read()
+
+    with open(path, mode="rb") as file:
+        return file.read()
+
+
+def write_output(output_path: str, data: str | bytes):
+    """Write output to a file, or to standard output when output_path is "-"."""
+    if output_path == "-":
+        if isinstance(data, bytes):
+            sys.stdout.buffer.write(data)
+            sys.stdout.buffer.flush()
+        else:
+            sys.stdout.write(data)
+            sys.stdout.flush()
+        return
+
+    with open(output_path, "wb" if isinstance(data, bytes) else "w") as output_file:
+        output_file.write(data)
+
+
+def hack_text(lines: list[str]) -> str:
+    """Contents of a .hack file holding the rendered lines, one word per line."""
+    if not lines:
+        return ""
+    return "\n".join(lines) + "\n"
+
+
+def write_hack(output_path: str, lines: list[str]):
+    """Write rendered lines to a .hack file, one word per line."""
+    write_output(output_path, hack_text(lines))
+
+
+# output formats and the extension each is written with
+# "hack" is the text format from the project contract- one word per line as 16 "0"/"1" characters
+# "rom-le"/"rom-be" are packed images, one little/big-endian unsigned 16-bit word per instruction
+output_format_extensions = {"hack": ".hack", "rom-le": ".bin", "rom-be": ".bin"}
+rom_byteorders = {"rom-le": "little", "rom-be": "big"}
+
+
+def words_to_rom(words: Iterable[int]) -> array:
+    """Pack words into an array('H') in native byte order, ready for a simulator to index."""
+    return array("H", words)
 
 
-def populate_symbol_table(instruction_list: list[str], symbol_table: dict[str, int]):
-    # Symbols
-    # • Label symbols
-    # • Variable symbols
-    skipped_line_count = 0
-    lines_to_remove = []
-    for line_number, inst in enumerate(instruction_list):
-        # handle Labels- value corresponds to line number of next line, but must be offset right?
+def write_rom(output_path: str, rom: array, byteorder: str = "little"):
+    """Write a packed ROM image, 2 bytes per word in the given byte order."""
+    if byteorder != sys.byteorder:
+        rom = array("H", rom)
+        rom.byteswap()
+
+    write_output(output_path, rom.tobytes())
+
+
+def read_rom(path: str, byteorder: str = "little") -> array:
+    """Read a packed ROM image written by write_rom back into native-order words."""
+    rom = array("H")
+
+    with open(path, "rb") as rom_file:
+        rom.frombytes(rom_file.read())
+
+    if byteorder != sys.byteorder:
+        rom.byteswap()
+
+    return rom
+
+
+class SymbolTable(dict):
+    """Symbol table that allocates variables lazily.
+
+    Looking up a symbol that is neither predefined nor a label treats it as a
+    variable and gives it the next free RAM address, starting at 16. Since
+    encoding walks the program in order, variables get the same addresses as
+    an eager pass over the instructions would give them.
+    """
+
+    def __init__(self, *args, next_variable_address: int = 16, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.next_variable_address = next_variable_address
+
+    def __missing__(self, symbol: str) -> int:
+        # Any symbol xxx which is neither predefined, nor defined elsewhere using an (xxx) label
+        # declaration, is treated as a variable
+        address = self.next_variable_address
+        self[symbol] = address
+        self.next_variable_address = address + 1
+        return address
+
+    def copy(self) -> "SymbolTable":
+        return SymbolTable(self, next_variable_address=self.next_variable_address)
+
+
+def iter_lexed_batches(file: BinaryIO, batch_size: int) -> Iterator[list[str]]:
+    """Read a binary file batch_size lines at a time, yielding each batch cleaned by lex_buffer."""
+    while batch := list(islice(file, batch_size)):
+        clean_lines = lex_buffer(b"".join(batch))
+        # a batch ending in a line break leaves an empty string after it- drop it so
+        # every batch has one entry per source line. Lone "\r" line breaks don't end a
+        # batch's lines, so a batch can hold more source lines than len(batch)
+        if batch[-1].endswith(b"\n"):
+            clean_lines.pop()
+        yield clean_lines
+
+
+def record_labels(instructions: Iterable[str], symbol_table: dict[str, int]) -> int:
+    """Record label addresses without keeping the instructions themselves.
+
+    Args:
+        instructions (Iterable[str]): cleaned lines, labels included- empty lines are skipped
+        symbol_table (dict[str, int]): symbol table to add labels to
+
+    Returns:
+        int: number of instructions seen, labels excluded
+    """
+    address = 0
+
+    for inst in instructions:
+        if not inst:
+            continue
+
         if inst.startswith("("):
             label = inst.strip("()")
 
             if not label.isdecimal() and label not in symbol_table:
-                symbol_table[label] = line_number - skipped_line_count
-                # trying to assign memory address of the next instruction
+                symbol_table[label] = address
+        else:
+            address += 1
+
+    return address
+
+
+def resolve_labels(
+    program: list[Instruction], symbol_table: dict[str, int]
+) -> list[Instruction]:
+    """Record label addresses and drop label lines in a single forward pass.
+
+    Args:
+        program (list[Instruction]): parsed program, labels included
+        symbol_table (dict[str, int]): symbol table to add labels to
+
+    Returns:
+        list[Instruction]: instructions with label lines removed, in program order
+    """
+    instructions = []
+    append = instructions.append
+
+    for inst in program:
+        if inst.kind == LABEL:
+            # labels don't count as lines- value is the address of the next instruction
+            label = inst.symbol
+
+            if not label.isdecimal() and label not in symbol_table:
+                symbol_table[label] = len(instructions)
+        else:
+            append(inst)
+
+    return instructions
+
+
+def assemble_words(
+    source_lines: Iterable[str],
+    symbol_table: SymbolTable | None = None,
+    c_words: dict[str, int] | None = None,
+) -> list[int]:
+    """Assemble source lines in memory, without reading or writing any files.
+
+    Args:
+        source_lines (Iterable[str]): lines of a Hack Assembly Language program
+        symbol_table (SymbolTable, optional): table to resolve into- a fresh copy of the
+            predefined symbols by default. It is filled with the program's labels and variables
+        c_words (dict[str, int], optional): c-instruction encodings to share, see parse_program
+
+    Returns:
+        list[int]: one 16-bit word per instruction
+    """
+    if symbol_table is None:
+        symbol_table = SymbolTable(symbol_table_dict_original)
 
-                # add to list of lines to remove from instruction list
-                lines_to_remove.append(line_number)
+    instructions = resolve_labels(parse_program(source_lines, c_words), symbol_table)
+    return encode_instructions(instructions, symbol_table)
 
-                # add to count of skipped lines
-                skipped_line_count = skipped_line_count + 1
 
-    # cleanup instruction list- remove labels since they don't count as lines
-    for line_index in sorted(lines_to_remove, reverse=True):
-        # reversed so we're removing right to left and therefore indexes aren't changing as we remove lower ones
-        del instruction_list[line_index]
+def assemble_source(source: str | Iterable[str]) -> list[str]:
+    """Assemble a program held in memory- nothing is read from or written to disk.
 
-    running_address_offset = 0
-    for inst in instruction_list:
-        if inst.startswith("@"):
-            # handle named variables- note they aren't ever used in C-insructions, only A-instructions
-            # Any symbol xxx which is neither predefined, nor defined elsewhere using an (xxx) label
-            # declaration, is treated as a variable
-            #
-            var = inst[1:]
+    Args:
+        source (str | Iterable[str]): program text, or its lines
+
+    Returns:
+        list[str]: the encoded program, one 16-character line per instruction
+    """
+    if isinstance(source, str):
+        source = split_lines(source)
+
+    return render_words(assemble_words(source))
+
+
+def default_output_path(path: str, output_format: str = "hack") -> str:
+    """Prog.hack in the same folder as the source, as the project contract specifies."""
+    return os.path.join(
+        os.path.dirname(path), "Prog" + output_format_extensions[output_format]
+    )
+
+
+class AssemblyStats:
+    """What one run of main did, and how long each phase took.
+
+    phase_seconds holds "read", "parse", "resolve", "encode" and "write",
+    plus "preprocess" and "optimize" when those ran, or just "read" and
+    "cache" (and "preprocess") when the output came from the cache.
+
+    A plain class rather than a dataclass- importing dataclasses pulls in inspect,
+    which costs more than assembling a small program.
+    """
+
+    fields = (
+        "path",
+        "output_path",
+        "lines_read",
+        "labels",
+        "variables",
+        "a_instructions",
+        "c_instructions",
+        "bytes_written",
+        "instructions_removed",
+        "cache_hit",
+        "phase_seconds",
+    )
+
+    def __init__(self, path: str, output_path: str):
+        self.path = path
+        self.output_path = output_path
+        self.lines_read = 0
+        self.labels = 0
+        self.variables = 0
+        self.a_instructions = 0
+        self.c_instructions = 0
+        self.bytes_written = 0
+        self.instructions_removed = 0
+        self.cache_hit = False
+        self.phase_seconds: dict[str, float] = {}
 
-            if not var.isdecimal() and var not in symbol_table:
-                # give vars running address starting at 16
-                symbol_table[var] = running_address_offset + 16
-                running_address_offset = running_address_offset + 1
+    @property
+    def total_seconds(self) -> float:
+        return sum(self.phase_seconds.values())
 
-    return symbol_table
+    def to_dict(self) -> dict:
+        report = {name: getattr(self, name) for name in self.fields}
+        report["phase_seconds"] = dict(self.phase_seconds)
+        report["total_seconds"] = self.total_seconds
+        return report
+
+    def summary(self) -> str:
+        phases = ", ".join(
+            f"{phase} {seconds * 1000:.2f}ms" for phase, seconds in self.phase_seconds.items()
+        )
+        return (
+            f"{self.path} -> {self.output_path}: {self.lines_read} lines read, "
+            f"{self.a_instructions} a-instructions, {self.c_instructions} c-instructions, "
+            f"{self.labels} labels, {self.variables} variables, {self.bytes_written} bytes written"
+            f"{f', {self.instructions_removed} instructions optimized away' if self.instructions_removed else ''}"
+            f"{' (cached)' if self.cache_hit else ''}\n"
+            f"  {phases}, total {self.total_seconds * 1000:.2f}ms"
+        )
 
 
-def main(path: str):
+def main(
+    path: str,
+    output_path: str | None = None,
+    verbose: bool = False,
+    cache: AssemblyCache | None = None,
+    output_format: str = "hack",
+    use_numpy: bool = False,
+    on_stats: Callable[[AssemblyStats], None] | None = None,
+    optimize: bool = False,
+    preprocess: bool = False,
+) -> list[str] | array:
     """
-        1- read file at given path line-by-line
+        1- read file at given path, optionally expanding its #include and #macro directives
         2- remove comments and whitespace
-        3- assemble into list of commands- input_lines_original
-        4- deal with symbols/variable substitution- return input_lines_working
-        5- parse result of step 4 - process each command
-        6- insert translation of commands into output_binary list
+        3- parse each line once into an Instruction record, then optionally drop redundant ones
+        4- record label addresses and drop label lines in one pass
+        5- encode each command, allocating variables as they are first seen
+        6- render the encoded words into output_binary list
         7- write output_binary list line-by-line to Prog.hack at same path as input file
         8- also return output_binary or a success/failure message to be output to console
 
     Args:
-        path (string): Path to <input>.asm, containing a valid Hack Assembly Language program.
+        path (string): Path to <input>.asm, containing a valid Hack Assembly Language program,
+            or "-" to read it from standard input
+        output_path (string, optional): where to write the binary, or "-" for standard output-
+            Prog.hack next to the source by default, standard output when reading standard input
+        verbose (bool): print the path and cleaned lines while assembling- for debugging only,
+            the cleaned lines of a large program run to megabytes
+        cache (AssemblyCache, optional): reuse the output of an earlier run on identical source-
+            only used for the "hack" output format
+        output_format (str): "hack" for text, or "rom-le"/"rom-be" for a packed image
+        use_numpy (bool): encode a-instructions and render text in bulk with NumPy,
+            falling back to the plain encoder when NumPy isn't installed
+        on_stats (Callable, optional): called with the AssemblyStats of the run once it's written-
+            counting instructions costs an extra pass, so it's only done when this is given
+        optimize (bool): remove provably redundant instructions before labels are resolved-
+            see hack_optimizer. The cache isn't used, since its entries are unoptimized
+        preprocess (bool): expand #include and #macro directives first- see hack_preprocessor.
+            The cache is keyed by the expanded source, so a changed include is a miss
+
+    Returns:
+        list[str] | array: the rendered lines, or for ROM formats the words as an array('H')-
+            wrap it in memoryview() to hand it on without copying
     """
-    output_binary = []
+    if output_format not in output_format_extensions:
+        raise ValueError(f"unknown output format '{output_format}'")
+
+    if output_path is None:
+        output_path = "-" if path == "-" else default_output_path(path, output_format)
+
+    if output_format != "hack" or optimize:
+        cache = None
+
+    stats = AssemblyStats(path, output_path)
+    phase_seconds = stats.phase_seconds
+    started = time.perf_counter()
+
+    source = read_source(path)
+
+    phase_seconds["read"] = time.perf_counter() - started
+
+    if preprocess:
+        # imported here since it's only needed for sources that use directives
+        from hack_preprocessor import preprocess as preprocess_source
+
+        started = time.perf_counter()
+        source = hack_text(preprocess_source(source.decode(), path)).encode()
+        phase_seconds["preprocess"] = time.perf_counter() - started
+
+    if cache is not None:
+        started = time.perf_counter()
+        cache_key = cache.key(source)
+        cached_text = cache.get(cache_key)
+
+        if cached_text is not None:
+            # identical source already assembled- skip parsing entirely
+            write_output(output_path, cached_text)
+            output_binary = cached_text.splitlines()
+            phase_seconds["cache"] = time.perf_counter() - started
+
+            if on_stats is not None:
+                stats.cache_hit = True
+                stats.lines_read = count_lines(source)
+                stats.bytes_written = len(cached_text)
+                on_stats(stats)
+            return output_binary
 
     # reset the global to ensure it only contains the shared symbols to start
-    symbol_table_dict = symbol_table_dict_original.copy()
-    # due to Python's handling of memory, need to explicitly copy original to not just point to it
-
-    print("PATH: " + path)
-
-    with open(path, mode="r") as file:
-        # Syntax Notes:
-        # `re.sub(r"\s+", "", line)` is for removing all whitespaces- strip only trims leading and trailing
-        subbed_lines = [
-            re.sub(r"\s+|//.*$", "", line)
-            for line in file
-            if line and (not line.isspace()) and (not line.startswith("//"))
-        ]
+    # variables are allocated lazily, the first time encoding looks them up
+    symbol_table_dict = SymbolTable(symbol_table_dict_original)
 
-        # subbed lines may output empty lines so need second filter round
-        clean_lines = [line for line in subbed_lines if line and (not line.isspace())]
+    if verbose:
+        print("PATH: " + path)
 
-        print("CLEAN LINES: " + str(clean_lines))
+    started = time.perf_counter()
+    clean_lines = lex_buffer(source)
+    program = parse_clean_lines(clean_lines)
+    phase_seconds["parse"] = time.perf_counter() - started
 
-        # populate symbol table with labels and variables
-        symbol_table_dict = populate_symbol_table(clean_lines, symbol_table_dict)
+    if verbose:
+        print("CLEAN LINES: " + str([inst.text for inst in program]))
 
-        for line in clean_lines:
-            if line.startswith("@"):
-                output_line = a_instruction(line, symbol_table_dict)
-                # internal logic in method handles translating variables and labels
-                output_binary.append(output_line)
-            elif line.startswith("("):
-                # ignore label lines themselves in translation
-                continue
-            else:
-                # must be c-instruction
-                output_line = c_instruction(line)
-                output_binary.append(output_line)
+    if optimize:
+        # imported here since hack_optimizer builds on this module
+        from hack_optimizer import optimize_program
 
-    # print("output_binary: " + str(output_binary))
+        started = time.perf_counter()
+        program, stats.instructions_removed = optimize_program(program)
+        phase_seconds["optimize"] = time.perf_counter() - started
 
-    path_parent_directory = os.path.dirname(path)  # get path only- cuts off filename
+    # populate symbol table with labels, dropping the label lines themselves
+    started = time.perf_counter()
+    instructions = resolve_labels(program, symbol_table_dict)
+    phase_seconds["resolve"] = time.perf_counter() - started
+    label_count = len(symbol_table_dict) - len(symbol_table_dict_original)
 
-    with open(f"{path_parent_directory}/Prog.hack", "w") as output_file:
-        for line in output_binary:
-            output_file.write(line + "\n")
+    started = time.perf_counter()
+    numpy_words = None
+    if use_numpy and load_numpy() is not None:
+        numpy_words = encode_instructions_numpy(instructions, symbol_table_dict)
+        words = numpy_words.tolist()
+    else:
+        words = encode_instructions(instructions, symbol_table_dict)
+    phase_seconds["encode"] = time.perf_counter() - started
 
-    return output_binary
+    started = time.perf_counter()
+    if output_format != "hack":
+        result = words_to_rom(words)
+        write_rom(output_path, result, rom_byteorders[output_format])
+        bytes_written = 2 * len(words)
+    else:
+        # words only become text once, right before writing
+        if numpy_words is not None:
+            result = render_words_numpy(numpy_words)
+        else:
+            result = render_words(words)
 
+        text = hack_text(result)
+        write_output(output_path, text)
+        bytes_written = len(text)
+
+        if cache is not None:
+            cache.put(cache_key, text)
+    phase_seconds["write"] = time.perf_counter() - started
+
+    if on_stats is not None:
+        a_count = sum(1 for inst in instructions if inst.kind == A_INSTRUCTION)
+        stats.lines_read = count_lines(source)
+        stats.labels = label_count
+        stats.variables = len(symbol_table_dict) - len(symbol_table_dict_original) - label_count
+        stats.a_instructions = a_count
+        stats.c_instructions = len(instructions) - a_count
+        stats.bytes_written = bytes_written
+        on_stats(stats)
+
+    return result
 
-if __name__ == "__main__":
-    result = main(sys.argv[1])
 
-    # print any return values to console
-    if result:
+def assemble_streaming(
+    path: str, output_path: str | None = None, batch_size: int = 4096
+) -> int:
+    """Assemble a file in two passes, never holding more than one batch in memory.
+
+        1- read the file as a generator, keeping only label addresses
+        2- re-read it, parsing, encoding and writing one batch of lines at a time
+
+    Args:
+        path (str): Path to <input>.asm
+        output_path (str, optional): where to write the binary, or "-" for standard output-
+            Prog.hack next to the source by default
+        batch_size (int): source lines parsed, encoded and written at a time
+
+    Returns:
+        int: number of instructions written
+    """
+    from contextlib import nullcontext
+
+    if output_path is None:
+        output_path = default_output_path(path)
+
+    symbol_table_dict = SymbolTable(symbol_table_dict_original)
+
+    with open(path, mode="rb") as file:
+        record_labels(
+            chain.from_iterable(iter_lexed_batches(file, batch_size)), symbol_table_dict
+        )
+
+    instruction_count = 0
+    output_context = nullcontext(sys.stdout) if output_path == "-" else open(output_path, "w")
+    with open(path, mode="rb") as file, output_context as output_file:
+        c_words = {}
+        line_number = 1
+
+        for clean_lines in iter_lexed_batches(file, batch_size):
+            program = parse_clean_lines(clean_lines, c_words, line_number)
+            line_number += len(clean_lines)
+
+            instructions = [inst for inst in program if inst.kind != LABEL]
+            words = encode_instructions(instructions, symbol_table_dict)
+            output_file.write(hack_text(render_words(words)))
+            instruction_count += len(words)
+
+    return instruction_count
+
+
+class BatchResult:
+    """How one file of a batch went- error is None when it assembled.
+
+    A plain class for the same reason as AssemblyStats- NamedTuple would import typing.
+    """
+
+    __slots__ = ("path", "output_path", "instruction_count", "error", "stats")
+
+    def __init__(
+        self,
+        path: str,
+        output_path: str,
+        instruction_count: int,
+        error: str | None,
+        # only collected when the batch is asked for stats
+        stats: AssemblyStats | None = None,
+    ):
+        self.path = path
+        self.output_path = output_path
+        self.instruction_count = instruction_count
+        self.error = error
+        self.stats = stats
+
+    def __repr__(self) -> str:
+        return f"BatchResult({self.path!r}, {self.instruction_count} instructions, error={self.error!r})"
+
+
+def batch_output_path(path: str, output_format: str = "hack") -> str:
+    """<name>.hack next to <name>.asm, so files in one batch don't overwrite each other."""
+    return os.path.splitext(path)[0] + output_format_extensions[output_format]
+
+
+def collect_asm_paths(targets: Iterable[str]) -> list[str]:
+    """Expand directories and glob patterns into a sorted list of .asm paths.
+
+    Args:
+        targets (Iterable[str]): directories, glob patterns, or plain file paths
+
+    Returns:
+        list[str]: every .asm path found, duplicates removed
+    """
+    import glob
+
+    paths = set()
+
+    for target in targets:
+        if os.path.isdir(target):
+            paths.update(glob.glob(os.path.join(target, "*.asm")))
+        elif glob.has_magic(target):
+            paths.update(glob.glob(target))
+        else:
+            paths.add(target)
+
+    return sorted(paths)
+
+
+def assemble_batch_entry(
+    path: str,
+    cache: AssemblyCache | None = None,
+    output_format: str = "hack",
+    preprocess: bool = False,
+    optimize: bool = False,
+    use_numpy: bool = False,
+    stats: bool = False,
+) -> BatchResult:
+    """Assemble one file of a batch, reporting failure instead of raising."""
+    output_path = batch_output_path(path, output_format)
+    reports = []
+
+    try:
+        output_binary = main(
+            path,
+            output_path,
+            cache=cache,
+            output_format=output_format,
+            use_numpy=use_numpy,
+            on_stats=reports.append if stats else None,
+            optimize=optimize,
+            preprocess=preprocess,
+        )
+    except Exception as error:
+        return BatchResult(path, output_path, 0, f"{type(error).__name__}: {error}")
+
+    return BatchResult(
+        path, output_path, len(output_binary), None, reports[0] if reports else None
+    )
+
+
+def assemble_batch(
+    paths: list[str],
+    max_workers: int | None = None,
+    cache: AssemblyCache | None = None,
+    output_format: str = "hack",
+    preprocess: bool = False,
+    optimize: bool = False,
+    use_numpy: bool = False,
+    stats: bool = False,
+) -> list[BatchResult]:
+    """Assemble many files in parallel, one process per core by default.
+
+    Args:
+        paths (list[str]): .asm files to assemble, each written to its own <name>.hack
+        max_workers (int, optional): size of the process pool, os.cpu_count() by default
+        cache (AssemblyCache, optional): shared by every worker, see main
+        output_format (str): see main
+        preprocess (bool): see main- each worker keeps its own cache of parsed
+            includes and macro expansions for all the files it's handed
+        optimize (bool): see main
+        use_numpy (bool): see main
+        stats (bool): collect the AssemblyStats of each file into its result
+
+    Returns:
+        list[BatchResult]: one result per path, in the order given
+    """
+    if not paths:
+        return []
+
+    from functools import partial
+
+    assemble_entry = partial(
+        assemble_batch_entry,
+        cache=cache,
+        output_format=output_format,
+        preprocess=preprocess,
+        optimize=optimize,
+        use_numpy=use_numpy,
+        stats=stats,
+    )
+
+    if max_workers == 1 or len(paths) == 1:
+        return [assemble_entry(path) for path in paths]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        # hand out several small files at a time to keep the pool busy
+        chunksize = max(1, len(paths) // (4 * (max_workers or os.cpu_count() or 1)))
+        return list(pool.map(assemble_entry, paths, chunksize=chunksize))
+
+
+def print_batch_summary(results: list[BatchResult]):
+    for result in results:
+        if result.error is None:
+            print(f"OK    {result.path} -> {result.output_path} ({result.instruction_count} instructions)")
+        else:
+            print(f"FAIL  {result.path}: {result.error}")
+
+    failures = sum(1 for result in results if result.error is not None)
+    print(f"{len(results) - failures} succeeded, {failures} failed")
+
+
+def write_stats_json(destination: str, report: dict | list[dict]):
+    import json
+
+    if destination == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+
+    with open(destination, "w") as report_file:
+        json.dump(report, report_file, indent=2)
+
+
+def reject_options(
+    parser: argparse.ArgumentParser, mode: str, options: list[tuple[str, bool]]
+):
+    """Exit with a usage error naming every given option that mode would silently ignore."""
+    unsupported = [option for option, given in options if given]
+    if unsupported:
+        parser.error(f"{mode} can't be used with {', '.join(unsupported)}")
+
+
+def cli(argv: list[str] | None = None) -> int:
+    cli_started = time.perf_counter()
+    if argv is None:
+        argv = sys.argv[1:]
+
+    if len(argv) == 1 and not argv[0].startswith("-"):
+        # one file with every option at its default- argparse would cost more than assembling it
+        main(argv[0])
+        return 0
+
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Translate a Hack Assembly Language program into Hack binary code."
+    )
+    parser.add_argument(
+        "path",
+        nargs="+",
+        help="path to the .asm source, or - for standard input- "
+        "with --batch, any number of files, directories or globs",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        metavar="PATH",
+        help="where to write the binary, or - for standard output "
+        "(default: Prog.hack next to the source, standard output for standard input)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="assemble in two streaming passes with bounded memory",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="assemble every given file in parallel, each into its own <name>.hack",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="worker processes for --batch (one per core by default)",
+    )
+    parser.add_argument(
+        "--cache",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="DIR",
+        help="reuse output for unchanged sources from an on-disk cache "
+        "($HACK_ASSEMBLER_CACHE or ~/.cache/hack_assembler unless DIR is given)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(output_format_extensions),
+        default="hack",
+        help="hack text (default), or a packed little/big-endian ROM image of 16-bit words",
+    )
+    parser.add_argument(
+        "--numpy",
+        action="store_true",
+        help="encode a-instructions and render text in bulk with NumPy, if it's installed",
+    )
+    parser.add_argument(
+        "--preprocess",
+        action="store_true",
+        help="expand #include and #macro directives before assembling",
+    )
+    parser.add_argument(
+        "--optimize",
+        action="store_true",
+        help="remove provably redundant instructions (peephole pass)",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="report time per phase and instruction counts on stderr",
+    )
+    parser.add_argument(
+        "--stats-json",
+        metavar="FILE",
+        help="write the same report as JSON to FILE, or to stdout with -",
+    )
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="check the whole program and report every error, without writing any output",
+    )
+    parser.add_argument(
+        "--self-test-timing",
+        action="store_true",
+        help="report on stderr how long importing, argument parsing and assembling each took",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="print the path, cleaned lines and encoded program (debugging only)",
+    )
+    args = parser.parse_args(argv)
+    arguments_seconds = time.perf_counter() - cli_started
+
+    cache = None
+    if args.cache is not None:
+        from hack_cache import AssemblyCache
+
+        cache = AssemblyCache(args.cache or None, version=__version__)
+
+    if args.batch:
+        if args.output:
+            parser.error("--output can't be used with --batch, each file gets its own <name>.hack")
+        if args.validate:
+            parser.error("--validate checks one file at a time, so it can't be used with --batch")
+        # each file is assembled whole in a worker, and only the summary is printed
+        reject_options(
+            parser,
+            "--batch",
+            [
+                ("--stream", args.stream),
+                ("--verbose", args.verbose),
+                ("--self-test-timing", args.self_test_timing),
+            ],
+        )
+        results = assemble_batch(
+            collect_asm_paths(args.path),
+            args.jobs,
+            cache,
+            args.format,
+            preprocess=args.preprocess,
+            optimize=args.optimize,
+            use_numpy=args.numpy,
+            stats=args.stats or bool(args.stats_json),
+        )
+        print_batch_summary(results)
+
+        reports = [result.stats for result in results if result.stats is not None]
+        if args.stats:
+            for stats in reports:
+                print(stats.summary(), file=sys.stderr)
+        if args.stats_json:
+            write_stats_json(args.stats_json, [stats.to_dict() for stats in reports])
+
+        return 1 if any(result.error is not None for result in results) else 0
+
+    if len(args.path) > 1:
+        parser.error("only one path can be assembled at a time without --batch")
+    if args.jobs is not None:
+        parser.error("--jobs sizes the --batch process pool, a single file is assembled in-process")
+
+    (path,) = args.path
+
+    if args.validate:
+        # nothing is assembled or written, only checked
+        reject_options(
+            parser,
+            "--validate",
+            [
+                ("--output", args.output is not None),
+                ("--format", args.format != "hack"),
+                ("--stream", args.stream),
+                ("--cache", args.cache is not None),
+                ("--numpy", args.numpy),
+                ("--optimize", args.optimize),
+                ("--stats", args.stats),
+                ("--stats-json", args.stats_json is not None),
+                ("--verbose", args.verbose),
+                ("--self-test-timing", args.self_test_timing),
+            ],
+        )
+        # imported here since valid programs never need it
+        from hack_validator import validate_file
+
+        try:
+            errors = validate_file(path, args.preprocess)
+        except ValueError as error:
+            # a broken directive- there's no expanded program to check
+            print(f"error: {error}", file=sys.stderr)
+            return 1
+        for error in errors:
+            print(f"{path}: {error}", file=sys.stderr)
+        return 1 if errors else 0
+
+    if args.stream:
+        if args.format != "hack":
+            parser.error("--stream only writes the hack text format")
+        if path == "-":
+            parser.error("--stream reads its input twice, so it can't read standard input")
+        # the streaming passes only parse, resolve, encode and write
+        reject_options(
+            parser,
+            "--stream",
+            [
+                ("--preprocess", args.preprocess),
+                ("--optimize", args.optimize),
+                ("--numpy", args.numpy),
+                ("--cache", args.cache is not None),
+                ("--stats", args.stats),
+                ("--stats-json", args.stats_json is not None),
+                ("--verbose", args.verbose),
+                ("--self-test-timing", args.self_test_timing),
+            ],
+        )
+        assemble_streaming(path, args.output)
+        return 0
+
+    reports = []
+    started = time.perf_counter()
+    result = main(
+        path,
+        args.output,
+        verbose=args.verbose,
+        cache=cache,
+        output_format=args.format,
+        use_numpy=args.numpy,
+        on_stats=reports.append if args.stats or args.stats_json else None,
+        optimize=args.optimize,
+        preprocess=args.preprocess,
+    )
+    assemble_seconds = time.perf_counter() - started
+
+    if args.verbose and result and args.format == "hack":
         print(result)
+
+    for stats in reports:
+        if args.stats:
+            print(stats.summary(), file=sys.stderr)
+        if args.stats_json:
+            write_stats_json(args.stats_json, stats.to_dict())
+
+    if args.self_test_timing:
+        print(
+            f"import {import_seconds * 1000:.2f}ms, argument parsing {arguments_seconds * 1000:.2f}ms, "
+            f"assembly {assemble_seconds * 1000:.2f}ms",
+            file=sys.stderr,
+        )
+
+    return 0
+
+
+# everything above is all importing this module does- see --self-test-timing
+import_seconds = time.perf_counter() - import_started
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,305 @@
+"""
+Benchmark harness for the assembler.
+
+Times each phase of main- reading, parsing, label resolution, encoding and
+writing, as reported through its on_stats hook- over the bundled
+translation_target programs and over synthetic programs of configurable
+size and mix. It also times a one-line edit to Pong.asm through
+hack_incremental against a full reassembly of the edited program. Results
+are saved as JSON so runs on different versions can be compared.
+
+    python hack_benchmark.py --sizes 10000 30000 --output bench.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+from typing import Callable
+
+from hack_assembler import (
+    __version__,
+    AssemblyStats,
+    comp_dict,
+    destination_dict,
+    jump_dict,
+    assemble_words,
+    main,
+    symbol_table_dict_original,
+)
+from hack_incremental import IncrementalProgram
+
+bundled_programs_directory = os.path.join(os.path.dirname(__file__), "translation_target")
+
+phases = ["read", "parse", "resolve", "encode", "write"]
+
+
+def generate_program(
+    instruction_count: int,
+    label_ratio: float = 0.05,
+    variable_ratio: float = 0.1,
+    c_ratio: float = 0.5,
+    seed: int = 0,
+) -> list[str]:
+    """Generate a valid Hack assembly program.
+
+    Args:
+        instruction_count (int): instructions in the program, labels excluded
+        label_ratio (float): labels defined per instruction
+        variable_ratio (float): share of a-instructions that reference a variable
+        c_ratio (float): share of instructions that are c-instructions
+        seed (int): seed for the generator, so programs are reproducible
+
+    Returns:
+        list[str]: source lines, including some comments and indentation like hand-written code
+
+    Raises:
+        ValueError: if instruction_count is more than the 32768 instructions ROM holds-
+            labels past the end of ROM don't fit in an a-instruction
+    """
+    if instruction_count > 32768:
+        raise ValueError(f"{instruction_count} instructions don't fit in the 32768-word ROM")
+
+    rng = random.Random(seed)
+
+    label_count = round(instruction_count * label_ratio)
+    labels = [f"LABEL_{index}" for index in range(label_count)]
+    # a pool around a tenth the size of the references, so variables get reused
+    variables = [
+        f"var_{index}"
+        for index in range(max(1, round(instruction_count * variable_ratio * 0.1)))
+    ]
+    predefined = list(symbol_table_dict_original)
+
+    comps = list(comp_dict)
+    dests = [dest for dest in destination_dict if dest is not None]
+    jumps = [jump for jump in jump_dict if jump is not None]
+
+    # spread the label definitions over the program
+    label_positions = sorted(rng.randrange(instruction_count + 1) for _ in labels)
+
+    lines = [f"// generated: {instruction_count} instructions, seed {seed}"]
+    next_label = 0
+
+    for position in range(instruction_count):
+        while next_label < label_count and label_positions[next_label] == position:
+            lines.append(f"({labels[next_label]})")
+            next_label += 1
+
+        if rng.random() < c_ratio:
+            comp = rng.choice(comps)
+            if rng.random() < 0.8:
+                instruction = f"{rng.choice(dests)}={comp}"
+            else:
+                instruction = f"{comp};{rng.choice(jumps)}"
+        else:
+            roll = rng.random()
+            if roll < variable_ratio:
+                instruction = f"@{rng.choice(variables)}"
+            elif labels and roll < variable_ratio + 0.3:
+                instruction = f"@{rng.choice(labels)}"
+            elif roll < variable_ratio + 0.5:
+                instruction = f"@{rng.choice(predefined)}"
+            else:
+                instruction = f"@{rng.randrange(32768)}"
+
+        if rng.random() < 0.05:
+            instruction += " // comment"
+        lines.append("    " + instruction)
+
+    while next_label < label_count:
+        lines.append(f"({labels[next_label]})")
+        next_label += 1
+
+    return lines
+
+
+def benchmark_program(
+    name: str, source_lines: list[str], working_directory: str, repeat: int = 5
+) -> dict:
+    """Best-of-repeat time for each phase of main on one program.
+
+    Returns:
+        dict: program name, line and instruction counts, seconds per phase,
+            total seconds and instructions per second
+    """
+    source_path = os.path.join(working_directory, "Prog.asm")
+    with open(source_path, "w") as source_file:
+        source_file.write("\n".join(source_lines) + "\n")
+
+    best = {phase: float("inf") for phase in phases}
+    runs: list[AssemblyStats] = []
+
+    for _ in range(repeat):
+        main(source_path, on_stats=runs.append)
+        for phase, seconds in runs[-1].phase_seconds.items():
+            best[phase] = min(best[phase], seconds)
+
+    stats = runs[-1]
+    instruction_count = stats.a_instructions + stats.c_instructions
+    total = sum(best.values())
+    return {
+        "name": name,
+        "lines": stats.lines_read,
+        "instructions": instruction_count,
+        "labels": stats.labels,
+        "variables": stats.variables,
+        "phases": best,
+        "total": total,
+        "instructions_per_second": instruction_count / total if total else None,
+    }
+
+
+def benchmark_incremental_edit(source_lines: list[str], repeat: int = 5) -> dict:
+    """Best-of-repeat time to apply a one-line edit incrementally, and to reassemble from scratch.
+
+    The edit inserts an instruction near the top, so nearly every label after it moves.
+
+    Returns:
+        dict: seconds for the incremental update and for the full reassembly
+    """
+    new_lines = list(source_lines)
+    new_lines.insert(min(50, len(new_lines)), "@SP")
+
+    update_seconds = float("inf")
+    full_seconds = float("inf")
+    for _ in range(repeat):
+        program = IncrementalProgram(source_lines)
+        started = time.perf_counter()
+        program.update(new_lines)
+        update_seconds = min(update_seconds, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        assemble_words(new_lines)
+        full_seconds = min(full_seconds, time.perf_counter() - started)
+
+    return {"update": update_seconds, "full": full_seconds}
+
+
+def run_benchmarks(
+    sizes: list[int],
+    repeat: int = 5,
+    label_ratio: float = 0.05,
+    variable_ratio: float = 0.1,
+    c_ratio: float = 0.5,
+    seed: int = 0,
+    include_bundled: bool = True,
+    progress: Callable[[dict], None] | None = None,
+) -> dict:
+    """Benchmark the bundled programs and one synthetic program per size.
+
+    Args:
+        sizes (list[int]): instruction counts of the synthetic programs
+        repeat (int): runs per program, the fastest of which is kept
+        label_ratio, variable_ratio, c_ratio, seed: passed to generate_program
+        include_bundled (bool): also benchmark every .asm in translation_target
+        progress (Callable, optional): called with each program's result as it finishes
+
+    Returns:
+        dict: environment details and one result per program, ready for json.dump
+    """
+    programs = []
+    incremental_edit = None
+
+    if include_bundled:
+        with open(os.path.join(bundled_programs_directory, "Pong.asm"), mode="r") as file:
+            incremental_edit = benchmark_incremental_edit(file.read().splitlines(), repeat)
+
+        for path in sorted(glob.glob(os.path.join(bundled_programs_directory, "*.asm"))):
+            with open(path, mode="r") as file:
+                programs.append((os.path.basename(path), file.read().splitlines()))
+
+    for size in sizes:
+        programs.append(
+            (
+                f"synthetic-{size}",
+                generate_program(size, label_ratio, variable_ratio, c_ratio, seed),
+            )
+        )
+
+    results = []
+    with tempfile.TemporaryDirectory() as working_directory:
+        for name, source_lines in programs:
+            result = benchmark_program(name, source_lines, working_directory, repeat)
+            results.append(result)
+            if progress is not None:
+                progress(result)
+
+    return {
+        "assembler_version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "settings": {
+            "repeat": repeat,
+            "label_ratio": label_ratio,
+            "variable_ratio": variable_ratio,
+            "c_ratio": c_ratio,
+            "seed": seed,
+        },
+        "results": results,
+        "incremental_edit": incremental_edit,
+    }
+
+
+def print_result(result: dict):
+    phase_times = "  ".join(
+        f"{phase} {result['phases'][phase] * 1000:8.2f}ms" for phase in phases
+    )
+    print(
+        f"{result['name']:>20}  {result['instructions']:>9} instructions  "
+        f"{phase_times}  total {result['total'] * 1000:8.2f}ms"
+    )
+
+
+def cli(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Time each phase of the Hack assembler.")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="*",
+        default=[10000, 30000],
+        help="instruction counts of the synthetic programs",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--label-ratio", type=float, default=0.05)
+    parser.add_argument("--variable-ratio", type=float, default=0.1)
+    parser.add_argument("--c-ratio", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--no-bundled",
+        action="store_true",
+        help="skip the translation_target programs",
+    )
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        args.sizes,
+        repeat=args.repeat,
+        label_ratio=args.label_ratio,
+        variable_ratio=args.variable_ratio,
+        c_ratio=args.c_ratio,
+        seed=args.seed,
+        include_bundled=not args.no_bundled,
+        progress=print_result,
+    )
+
+    incremental_edit = report["incremental_edit"]
+    if incremental_edit is not None:
+        print(
+            f"one-line edit to Pong.asm: incremental {incremental_edit['update'] * 1000:.2f}ms, "
+            f"full reassembly {incremental_edit['full'] * 1000:.2f}ms"
+        )
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    cli()
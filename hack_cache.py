@@ -0,0 +1,145 @@
+"""
+On-disk cache of assembled output, keyed by a hash of the source bytes and
+the assembler version.
+
+Each entry is the exact text of a .hack file, stored under its key. Hits
+bump the entry's modification time, so evicting the oldest entries first
+once the cache grows past its size limit drops the least recently used ones.
+
+The directory is only listed when the cache is first written to, and again
+when the running total of what's been written passes the limit. Eviction
+then makes room for a run of further writes, so a batch of N files doesn't
+list the directory N times. Each process keeps its own total, so processes
+sharing a cache can go over the limit by what the others wrote since they
+last listed it.
+"""
+
+import hashlib
+import os
+import tempfile
+
+
+def default_cache_directory() -> str:
+    """$HACK_ASSEMBLER_CACHE if set, otherwise hack_assembler under the user cache folder."""
+    directory = os.environ.get("HACK_ASSEMBLER_CACHE")
+    if directory:
+        return directory
+
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "hack_assembler")
+
+
+class AssemblyCache:
+    """Content-addressed store of assembled .hack text.
+
+    Args:
+        directory (str, optional): where entries are kept, default_cache_directory() by default
+        version (str): assembler version- part of every key, so upgrading invalidates old entries
+        max_bytes (int): total size entries may use before the least recently used are evicted
+    """
+
+    # eviction goes down to this share of max_bytes, so the next writes don't each trigger it
+    evict_to_fraction = 0.875
+
+    def __init__(
+        self,
+        directory: str | None = None,
+        version: str = "",
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.directory = directory or default_cache_directory()
+        self.version = version
+        self.max_bytes = max_bytes
+        # size of the entries as of the last listing, plus everything written since-
+        # None until the first put lists the directory
+        self.total_bytes: int | None = None
+
+    def key(self, source: bytes) -> str:
+        digest = hashlib.sha256(self.version.encode())
+        digest.update(b"\0")
+        digest.update(source)
+        return digest.hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.hack")
+
+    def get(self, key: str) -> str | None:
+        """Return the cached .hack text for key, or None on a miss."""
+        entry_path = self.entry_path(key)
+
+        try:
+            with open(entry_path, "r") as entry_file:
+                text = entry_file.read()
+        except FileNotFoundError:
+            return None
+
+        # mark as recently used
+        try:
+            os.utime(entry_path)
+        except FileNotFoundError:
+            # evicted by another process since we read it- the text is still good
+            pass
+
+        return text
+
+    def put(self, key: str, text: str):
+        """Store the .hack text for key, then evict old entries if over the size limit."""
+        os.makedirs(self.directory, exist_ok=True)
+        if self.total_bytes is None:
+            self.total_bytes = self.scan()[1]
+
+        # write to a temp file and rename, so concurrent readers never see a partial entry
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "w") as temp_file:
+                temp_file.write(text)
+            os.replace(temp_path, self.entry_path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        # an overwritten entry is counted twice, which only makes eviction come sooner
+        self.total_bytes += len(text)
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def scan(self) -> tuple[list[tuple[float, int, str]], int]:
+        """List every entry as (modification time, size, path), and their total size."""
+        entries = []
+        total_bytes = 0
+
+        with os.scandir(self.directory) as scanned:
+            for entry in scanned:
+                if not entry.name.endswith(".hack"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_bytes += stat.st_size
+
+        return entries, total_bytes
+
+    def evict(self):
+        """Delete least recently used entries until the cache is back under its limit.
+
+        Goes down to evict_to_fraction of max_bytes once it's over, leaving
+        room for the writes that follow.
+        """
+        entries, total_bytes = self.scan()
+
+        if total_bytes > self.max_bytes:
+            target_bytes = self.max_bytes * self.evict_to_fraction
+            for _, size, entry_path in sorted(entries):
+                try:
+                    os.unlink(entry_path)
+                except FileNotFoundError:
+                    pass
+                total_bytes -= size
+                if total_bytes <= target_bytes:
+                    break
+
+        self.total_bytes = total_bytes
@@ -0,0 +1,152 @@
+"""
+Long-running assembler server, so repeated requests don't each pay for
+interpreter startup, imports and building the tables.
+
+Speaks a JSON-lines protocol- one request object per line in, one response
+object per line out- over stdin/stdout, or over a Unix socket with --socket.
+
+Requests:
+    {"source": "<asm text>"}            assemble source text
+    {"path": "Prog.asm"}                assemble a file
+    ...,  "output": "Prog.hack"         also write the .hack text there
+    ...,  "render": true                return .hack lines instead of integer words
+    {"command": "ping"}                 check the server is up
+
+Any "id" in a request is echoed back in its response. Responses are
+{"ok": true, "words": [...]} (or "lines" when rendered, or "instructions"
+when written to "output"), or {"ok": false, "error": "..."}.
+
+    python hack_daemon.py
+    python hack_daemon.py --socket /tmp/hack_assembler.sock
+"""
+
+import argparse
+import json
+import os
+import socketserver
+import sys
+from typing import TextIO
+
+from hack_assembler import (
+    SymbolTable,
+    assemble_words,
+    hack_text,
+    render_words,
+    split_lines,
+    symbol_table_dict_original,
+)
+
+
+class AssemblerService:
+    """Handles requests against state kept warm between them.
+
+    The predefined symbol table is built once and copied per request, and
+    c-instruction encodings are shared by every request the service handles.
+    """
+
+    def __init__(self):
+        self.symbol_table_template = SymbolTable(symbol_table_dict_original)
+        self.c_words: dict[str, int] = {}
+
+    def assemble(self, request: dict) -> dict:
+        if "source" in request:
+            source_lines = split_lines(request["source"])
+        elif "path" in request:
+            with open(request["path"], mode="r") as file:
+                source_lines = split_lines(file.read())
+        else:
+            raise ValueError("request needs a 'source' or a 'path'")
+
+        words = assemble_words(
+            source_lines, self.symbol_table_template.copy(), self.c_words
+        )
+
+        if "output" in request:
+            with open(request["output"], "w") as output_file:
+                output_file.write(hack_text(render_words(words)))
+            return {"ok": True, "instructions": len(words)}
+
+        if request.get("render"):
+            return {"ok": True, "lines": render_words(words)}
+
+        return {"ok": True, "words": words}
+
+    def handle(self, request: dict) -> dict:
+        """Answer one request, turning any failure into an error response."""
+        try:
+            if request.get("command") == "ping":
+                response = {"ok": True}
+            else:
+                response = self.assemble(request)
+        except Exception as error:
+            response = {"ok": False, "error": f"{type(error).__name__}: {error}"}
+
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    def handle_line(self, line: str) -> str:
+        """Answer one JSON-lines request line with one response line."""
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as error:
+            return json.dumps({"ok": False, "error": f"bad request: {error}"})
+
+        return json.dumps(self.handle(request))
+
+
+def serve_stdio(service: AssemblerService, input_stream: TextIO, output_stream: TextIO):
+    """Answer requests from input_stream until it closes."""
+    for line in input_stream:
+        if not line.strip():
+            continue
+        output_stream.write(service.handle_line(line) + "\n")
+        output_stream.flush()
+
+
+def serve_unix_socket(service: AssemblerService, socket_path: str):
+    """Answer requests on a Unix socket until interrupted, one thread per connection."""
+
+    class RequestHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                self.wfile.write((service.handle_line(line.decode()) + "\n").encode())
+                self.wfile.flush()
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    with socketserver.ThreadingUnixStreamServer(socket_path, RequestHandler) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(socket_path)
+
+
+def cli(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        description="Serve Hack assembly requests as JSON lines, keeping the assembler warm."
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="listen on this Unix socket instead of stdin/stdout",
+    )
+    args = parser.parse_args(argv)
+
+    service = AssemblerService()
+
+    if args.socket:
+        serve_unix_socket(service, args.socket)
+    else:
+        serve_stdio(service, sys.stdin, sys.stdout)
+
+
+if __name__ == "__main__":
+    cli()
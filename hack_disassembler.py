@@ -0,0 +1,238 @@
+"""
+Disassembler for Hack machine code- the reverse of hack_assembler.
+
+Reads .hack text or a packed ROM image (as written by --format rom-le/rom-be)
+and writes assembly that assembles back to the same words. Labels and
+variable names aren't in the machine code, so every a-instruction comes out
+as a plain @address.
+
+Decoding is table driven- inverse tables indexed by the comp, dest and jump
+bit fields, built from the assembler's own tables- and each distinct word
+is only decoded once. Input is read and written in chunks, so large images
+stream through in bounded memory.
+
+    python hack_disassembler.py translation_target/Pong_test_expected.hack -o Pong.asm
+    python hack_disassembler.py Prog.bin --format rom-be
+"""
+
+import argparse
+import os
+import sys
+from array import array
+from contextlib import nullcontext
+from itertools import islice
+from typing import BinaryIO, Iterable, Iterator, NamedTuple, TextIO
+
+from hack_assembler import comp_dict, jump_dict, rom_byteorders
+
+# Inverse tables, indexed by the value of each bit field
+# 1 1 1 a c1 c2 c3 c4 c5 c6 d1 d2 d3 j1 j2 j3
+comp_names: list[str | None] = [None] * 128
+for comp, bits in comp_dict.items():
+    comp_names[int(bits, 2)] = comp
+
+jump_names: list[str | None] = [None] * 8
+for jump, bits in jump_dict.items():
+    jump_names[int(bits, 2)] = jump
+
+# destination_dict accepts every ordering of the registers- write the usual one
+destination_names = [None, "M", "D", "MD", "A", "AM", "AD", "AMD"]
+
+
+def disassemble_word(word: int) -> str | None:
+    """Decode one 16-bit word.
+
+    Args:
+        word (int): machine code word
+
+    Returns:
+        str | None: the instruction, e.g. "@21" or "MD=M+1" or "0;JMP"- None when
+            the word isn't something the assembler could have produced, like an
+            unknown comp bit pattern, a c-instruction without its 111 prefix, or
+            one with neither dest nor jump, which has no "=" or ";" to write it with
+    """
+    if not word >> 15:
+        return f"@{word}"
+
+    if word >> 13 != 0b111:
+        return None
+
+    comp = comp_names[(word >> 6) & 0b1111111]
+    if comp is None:
+        return None
+
+    dest = destination_names[(word >> 3) & 0b111]
+    jump = jump_names[word & 0b111]
+    if dest is None and jump is None:
+        return None
+
+    instruction = comp
+    if dest is not None:
+        instruction = f"{dest}={instruction}"
+    if jump is not None:
+        instruction = f"{instruction};{jump}"
+    return instruction
+
+
+class DisassemblyTable(dict):
+    """Memo of decoded words, filled in as words are first seen- None for unknown ones."""
+
+    def __missing__(self, word: int) -> str | None:
+        instruction = disassemble_word(word)
+        self[word] = instruction
+        return instruction
+
+
+# shared by everything disassembled in this process
+disassembly_table = DisassemblyTable()
+
+
+def iter_hack_words(file: TextIO) -> Iterator[int]:
+    """Read words from .hack text, one 16-character line of 0s and 1s per word."""
+    # a ROM repeats a small set of lines, so each distinct line is only converted once-
+    # blank lines map to None
+    words_by_line: dict[str, int | None] = {}
+
+    for line_number, line in enumerate(file, 1):
+        try:
+            word = words_by_line[line]
+        except KeyError:
+            text = line.strip()
+            if not text:
+                word = None
+            elif len(text) == 16 and not text.strip("01"):
+                word = int(text, 2)
+            else:
+                raise ValueError(f"line {line_number}: '{text}' is not a 16-bit word") from None
+            words_by_line[line] = word
+
+        if word is not None:
+            yield word
+
+
+def iter_rom_words(
+    file: BinaryIO, byteorder: str = "little", chunk_bytes: int = 1 << 16
+) -> Iterator[int]:
+    """Read words from a packed ROM image, chunk_bytes at a time."""
+    while chunk := file.read(chunk_bytes):
+        words = array("H")
+        words.frombytes(chunk[: len(chunk) & ~1])
+        if byteorder != sys.byteorder:
+            words.byteswap()
+        yield from words
+
+        if len(chunk) & 1:
+            raise ValueError("ROM image has an odd number of bytes")
+
+
+def disassemble_words(words: Iterable[int], unknown: list[int] | None = None) -> Iterator[str]:
+    """Decode words into assembly lines.
+
+    Args:
+        words (Iterable[int]): machine code words
+        unknown (list[int], optional): gets the address of every word that can't be decoded
+
+    Returns:
+        Iterator[str]: one line per word- unknown words become a comment holding
+            their bits, so the line still shows where they were
+    """
+    table = disassembly_table
+
+    for address, word in enumerate(words):
+        instruction = table[word]
+        if instruction is None:
+            if unknown is not None:
+                unknown.append(address)
+            instruction = f"// unknown instruction {word:016b} at {address}"
+        yield instruction
+
+
+class DisassemblyResult(NamedTuple):
+    instructions: int
+    unknown: list[int]
+
+
+def disassemble(
+    path: str,
+    output_path: str | None = None,
+    input_format: str | None = None,
+    batch_size: int = 4096,
+) -> DisassemblyResult:
+    """Disassemble a .hack file or ROM image, streaming it batch_size words at a time.
+
+    Args:
+        path (str): .hack text or packed ROM image
+        output_path (str, optional): where to write the assembly- standard output by default, or with "-"
+        input_format (str, optional): "hack", "rom-le" or "rom-be"- by default .bin files
+            are read as rom-le and anything else as hack text
+        batch_size (int): lines decoded and written at a time
+
+    Returns:
+        DisassemblyResult: number of words read, and the addresses of any that couldn't be decoded
+    """
+    if input_format is None:
+        input_format = "rom-le" if path.endswith(".bin") else "hack"
+
+    if input_format == "hack":
+        input_context = open(path, mode="r")
+    else:
+        input_context = open(path, mode="rb")
+
+    if output_path is None or output_path == "-":
+        output_context = nullcontext(sys.stdout)
+    else:
+        output_context = open(output_path, "w")
+
+    unknown = []
+    instruction_count = 0
+
+    with input_context as file, output_context as output_file:
+        if input_format == "hack":
+            words = iter_hack_words(file)
+        else:
+            words = iter_rom_words(file, rom_byteorders[input_format])
+
+        lines = disassemble_words(words, unknown)
+        while batch := list(islice(lines, batch_size)):
+            output_file.write("\n".join(batch) + "\n")
+            instruction_count += len(batch)
+
+    return DisassemblyResult(instruction_count, unknown)
+
+
+def cli(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Translate Hack binary code back into Hack Assembly Language."
+    )
+    parser.add_argument("path", help="path to the .hack text or .bin ROM image")
+    parser.add_argument(
+        "-o",
+        "--output",
+        metavar="PATH",
+        help="where to write the assembly (default: standard output)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["hack", *sorted(rom_byteorders)],
+        default=None,
+        help="input format (default: rom-le for .bin files, hack text otherwise)",
+    )
+    args = parser.parse_args(argv)
+
+    result = disassemble(args.path, args.output, args.format)
+
+    if result.unknown:
+        addresses = ", ".join(str(address) for address in result.unknown[:10])
+        more = "..." if len(result.unknown) > 10 else ""
+        print(
+            f"{os.path.basename(args.path)}: {len(result.unknown)} of {result.instructions} "
+            f"words couldn't be decoded, at {addresses}{more}",
+            file=sys.stderr,
+        )
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
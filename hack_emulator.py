@@ -0,0 +1,306 @@
+"""
+Hack CPU emulator, for running assembled programs without the Java tools.
+
+A HackComputer loads a word array, as returned by main(..., output_format="rom-le"),
+or a .hack/.bin file. It runs the words against 16-bit RAM with the screen
+memory-mapped at SCREEN and the keyboard at KBD, the same as the real
+machine. Before it runs, every instruction is decoded once into a tuple of
+the comp operation, dest bits, jump bits and a-instruction value. The run
+loop then dispatches on those tuples with no bit twiddling.
+
+Programs on the Hack platform never stop- they end in an (END) @END 0;JMP
+loop. The emulator treats reaching such a loop as halting, and otherwise
+stops after a cycle limit.
+
+    python hack_emulator.py translation_target/Prog.hack --set 0=2 1=3 --show 0-2
+"""
+
+import argparse
+import os
+import sys
+import time
+from array import array
+from typing import Callable, Iterable
+
+from hack_assembler import comp_dict, load_numpy, rom_byteorders, symbol_table_dict_original
+from hack_disassembler import iter_hack_words, iter_rom_words
+
+SCREEN = symbol_table_dict_original["SCREEN"]
+KBD = symbol_table_dict_original["KBD"]
+SCREEN_ROWS = 256
+SCREEN_WORDS_PER_ROW = 32
+
+# what each comp computes, from D, A and M- results are 16-bit two's complement, kept unsigned
+comp_operations: dict[str, Callable[[int, int, int], int]] = {
+    "0": lambda d, a, m: 0,
+    "1": lambda d, a, m: 1,
+    "-1": lambda d, a, m: 0xFFFF,
+    "D": lambda d, a, m: d,
+    "A": lambda d, a, m: a,
+    "!D": lambda d, a, m: d ^ 0xFFFF,
+    "!A": lambda d, a, m: a ^ 0xFFFF,
+    "-D": lambda d, a, m: -d & 0xFFFF,
+    "-A": lambda d, a, m: -a & 0xFFFF,
+    "D+1": lambda d, a, m: (d + 1) & 0xFFFF,
+    "A+1": lambda d, a, m: (a + 1) & 0xFFFF,
+    "D-1": lambda d, a, m: (d - 1) & 0xFFFF,
+    "A-1": lambda d, a, m: (a - 1) & 0xFFFF,
+    "D+A": lambda d, a, m: (d + a) & 0xFFFF,
+    "D-A": lambda d, a, m: (d - a) & 0xFFFF,
+    "A-D": lambda d, a, m: (a - d) & 0xFFFF,
+    "D&A": lambda d, a, m: d & a,
+    "D|A": lambda d, a, m: d | a,
+    "M": lambda d, a, m: m,
+    "!M": lambda d, a, m: m ^ 0xFFFF,
+    "-M": lambda d, a, m: -m & 0xFFFF,
+    "M+1": lambda d, a, m: (m + 1) & 0xFFFF,
+    "M-1": lambda d, a, m: (m - 1) & 0xFFFF,
+    "D+M": lambda d, a, m: (d + m) & 0xFFFF,
+    "D-M": lambda d, a, m: (d - m) & 0xFFFF,
+    "M-D": lambda d, a, m: (m - d) & 0xFFFF,
+    "D&M": lambda d, a, m: d & m,
+    "D|M": lambda d, a, m: d | m,
+}
+
+# the same, indexed by the 7 comp bits (a c1 c2 c3 c4 c5 c6)
+comp_operation_table: list[Callable[[int, int, int], int] | None] = [None] * 128
+for comp, bits in comp_dict.items():
+    comp_operation_table[int(bits, 2)] = comp_operations[comp]
+
+# one predecoded instruction- (comp operation, dest bits, jump bits, a-instruction value),
+# comp operation is None for a-instructions
+Decoded = tuple[Callable[[int, int, int], int] | None, int, int, int]
+
+
+def decode_word(word: int, address: int = 0) -> Decoded:
+    """Decode one word into the tuple the run loop dispatches on.
+
+    Like the real CPU, a word with its top bit set is a c-instruction whatever its next two bits are.
+
+    Raises:
+        ValueError: if the comp bits aren't a known computation
+    """
+    if not word >> 15:
+        return (None, 0, 0, word)
+
+    operation = comp_operation_table[(word >> 6) & 0b1111111]
+    if operation is None:
+        raise ValueError(
+            f"ROM[{address}]: unknown comp bits {(word >> 6) & 0b1111111:07b} in {word:016b}"
+        )
+
+    return (operation, (word >> 3) & 0b111, word & 0b111, 0)
+
+
+class HackComputer:
+    """The Hack computer- ROM, RAM, the A, D and PC registers, and a cycle count.
+
+    Args:
+        words (Iterable[int]): the program, one 16-bit word per instruction
+    """
+
+    def __init__(self, words: Iterable[int]):
+        self.rom = array("H", words)
+        if len(self.rom) > 32768:
+            raise ValueError(f"program has {len(self.rom)} instructions, ROM only holds 32768")
+
+        decoded_by_word: dict[int, Decoded] = {}
+        program = []
+        for address, word in enumerate(self.rom):
+            decoded = decoded_by_word.get(word)
+            if decoded is None:
+                decoded = decoded_by_word[word] = decode_word(word, address)
+            program.append(decoded)
+        self.program = program
+
+        # addresses of (END) @END 0;JMP loops- reaching one means the program is done
+        self.halt_addresses = {
+            address
+            for address, (operation, _, jump, value) in enumerate(program[:-1])
+            if operation is None and value == address and program[address + 1][2] == 0b111
+        }
+
+        # the full 16-bit address space, so any value in A can be used as an address
+        self.ram = array("H", bytes(2 * 65536))
+        self.reset()
+
+    @classmethod
+    def from_file(cls, path: str, input_format: str | None = None) -> "HackComputer":
+        """Load a .hack text file or ROM image- see hack_disassembler.disassemble for input_format."""
+        if input_format is None:
+            input_format = "rom-le" if path.endswith(".bin") else "hack"
+
+        if input_format == "hack":
+            with open(path, mode="r") as file:
+                return cls(iter_hack_words(file))
+
+        with open(path, mode="rb") as file:
+            return cls(iter_rom_words(file, rom_byteorders[input_format]))
+
+    def reset(self):
+        """Start the program again from address 0. RAM is left as it is, like the reset button."""
+        self.a = 0
+        self.d = 0
+        self.pc = 0
+        self.cycles = 0
+        self.halted = False
+
+    def run(self, max_cycles: int = 1_000_000) -> int:
+        """Run until the program halts, runs off the end of ROM, or max_cycles have passed.
+
+        Can be called again to carry on from where it stopped.
+
+        Returns:
+            int: cycles run by this call
+        """
+        program = self.program
+        halt_addresses = self.halt_addresses
+        ram = self.ram
+        a = self.a
+        d = self.d
+        pc = self.pc
+        size = len(program)
+        cycles = 0
+
+        while cycles < max_cycles and pc < size:
+            operation, dest, jump, value = program[pc]
+            cycles += 1
+
+            if operation is None:
+                a = value
+                pc += 1
+                continue
+
+            out = operation(d, a, ram[a])
+            target = a
+
+            # dest bits are A D M, written as literals since a module constant costs a global lookup
+            if dest:
+                if dest & 0b001:
+                    ram[a] = out
+                if dest & 0b010:
+                    d = out
+                if dest & 0b100:
+                    a = out
+
+            # jump bits are JLT JEQ JGT- jump when one of them matches the sign of the result
+            if jump and jump & (0b100 if out & 0x8000 else 0b001 if out else 0b010):
+                if target == pc - 1 and target in halt_addresses:
+                    pc = target
+                    self.halted = True
+                    break
+                pc = target
+            else:
+                pc += 1
+
+        if pc >= size:
+            self.halted = True
+
+        self.a = a
+        self.d = d
+        self.pc = pc
+        self.cycles += cycles
+        return cycles
+
+    def press_key(self, key_code: int):
+        """Hold down a key- 0 releases it."""
+        self.ram[KBD] = key_code
+
+    def screen_buffer(self):
+        """The screen memory map as a (256, 32) NumPy uint16 array sharing memory with RAM.
+
+        Live- it changes as the program draws, and writes to it show up in RAM.
+
+        Raises:
+            RuntimeError: if NumPy isn't installed
+        """
+        numpy = load_numpy()
+        if numpy is None:
+            raise RuntimeError("the screen buffer needs NumPy, which isn't installed")
+
+        words = numpy.frombuffer(self.ram, dtype=numpy.uint16)
+        return words[SCREEN : SCREEN + SCREEN_ROWS * SCREEN_WORDS_PER_ROW].reshape(
+            SCREEN_ROWS, SCREEN_WORDS_PER_ROW
+        )
+
+    def screen_pixels(self):
+        """The screen as a (256, 512) NumPy bool array, True where a pixel is black.
+
+        Raises:
+            RuntimeError: if NumPy isn't installed
+        """
+        numpy = load_numpy()
+        buffer = self.screen_buffer()
+        # the least significant bit of each word is its leftmost pixel
+        bits = numpy.unpackbits(buffer.astype("<u2").view(numpy.uint8), bitorder="little")
+        return bits.reshape(SCREEN_ROWS, 512).astype(bool)
+
+
+def parse_assignment(text: str) -> tuple[int, int]:
+    address, _, value = text.partition("=")
+    return int(address), int(value) & 0xFFFF
+
+
+def parse_address_range(text: str) -> range:
+    first, _, last = text.partition("-")
+    return range(int(first), int(last or first) + 1)
+
+
+def signed(word: int) -> int:
+    return word - 0x10000 if word & 0x8000 else word
+
+
+def cli(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run a Hack program on an emulated Hack CPU.")
+    parser.add_argument("path", help="path to the .hack text or .bin ROM image")
+    parser.add_argument(
+        "--format",
+        choices=["hack", *sorted(rom_byteorders)],
+        default=None,
+        help="input format (default: rom-le for .bin files, hack text otherwise)",
+    )
+    parser.add_argument(
+        "--cycles",
+        type=int,
+        default=10_000_000,
+        help="stop after this many cycles if the program hasn't halted",
+    )
+    parser.add_argument(
+        "--set",
+        nargs="*",
+        default=[],
+        type=parse_assignment,
+        metavar="ADDRESS=VALUE",
+        help="set RAM before running",
+    )
+    parser.add_argument(
+        "--show",
+        nargs="*",
+        default=[],
+        type=parse_address_range,
+        metavar="ADDRESS[-ADDRESS]",
+        help="print these RAM addresses after running",
+    )
+    args = parser.parse_args(argv)
+
+    computer = HackComputer.from_file(args.path, args.format)
+    for address, value in args.set:
+        computer.ram[address] = value
+
+    started = time.perf_counter()
+    cycles = computer.run(args.cycles)
+    seconds = time.perf_counter() - started
+
+    state = "halted" if computer.halted else "stopped at the cycle limit"
+    rate = f", {cycles / seconds / 1e6:.2f}M cycles/s" if seconds else ""
+    print(f"{os.path.basename(args.path)}: {state} after {cycles} cycles{rate}", file=sys.stderr)
+
+    for addresses in args.show:
+        for address in addresses:
+            print(f"RAM[{address}] = {signed(computer.ram[address])}")
+
+    return 0 if computer.halted else 1
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,308 @@
+"""
+Incremental reassembly for editor/watch workflows.
+
+An IncrementalProgram keeps the state of a finished assembly- the source
+lines, the label-free instruction list, the symbol table and the encoded
+words. A text edit re-encodes only the lines it touches. The only other
+words it patches are the a-instructions whose label or variable address
+moved because of it.
+"""
+
+import difflib
+from typing import Iterable, Iterator, NamedTuple
+
+from hack_assembler import (
+    Instruction,
+    SymbolTable,
+    check_symbol_range,
+    clean_line,
+    encode_instructions,
+    max_constant,
+    parse_line,
+    render_words,
+    split_lines,
+    symbol_table_dict_original,
+)
+
+
+# kinds of symbol an a-instruction can refer to, one byte per instruction in reference_kinds
+LABEL_REFERENCE = 1
+VARIABLE_REFERENCE = 2
+
+
+class TextEdit(NamedTuple):
+    """Replace source lines [start, end) with new_lines."""
+
+    start: int
+    end: int
+    new_lines: list[str]
+
+
+def common_length(
+    old_lines: list[str], new_lines: list[str], limit: int, from_end: bool = False
+) -> int:
+    """How many lines the two have in common at their start, or at their end, up to limit.
+
+    Compares a slice of lines at a time, since list equality runs in C and
+    is nearly free for lines shared by both versions. Only the slice holding
+    the first difference is searched line by line.
+    """
+    old_length = len(old_lines)
+    new_length = len(new_lines)
+
+    def line_pair(index: int) -> tuple[str, str]:
+        if from_end:
+            return old_lines[old_length - 1 - index], new_lines[new_length - 1 - index]
+        return old_lines[index], new_lines[index]
+
+    start = 0
+    while start < limit:
+        stop = min(start + compare_step, limit)
+        if from_end:
+            same = (
+                old_lines[old_length - stop : old_length - start]
+                == new_lines[new_length - stop : new_length - start]
+            )
+        else:
+            same = old_lines[start:stop] == new_lines[start:stop]
+        if not same:
+            break
+        start = stop
+
+    while start < limit:
+        old_line, new_line = line_pair(start)
+        if old_line != new_line:
+            break
+        start += 1
+
+    return start
+
+
+# lines compared at a time while looking for the first and last changed line
+compare_step = 1024
+
+# windows with more line pairs than this are replaced whole rather than diffed
+max_diff_window = 250_000
+
+
+def diff_edits(old_lines: list[str], new_lines: list[str]) -> list[TextEdit]:
+    """Turn two versions of a source into the edits that take one to the other.
+
+    SequenceMatcher is quadratic on compiler output, where the same lines
+    repeat thousands of times, so it's only run on the window between the
+    lines both versions start and end with. That window is usually a few
+    lines around the edit. A window too big to diff quickly becomes a single
+    edit replacing all of it.
+
+    Returns:
+        list[TextEdit]: edits in descending line order, so each can be applied
+            without shifting the line numbers of the ones after it
+    """
+    common = min(len(old_lines), len(new_lines))
+    prefix = common_length(old_lines, new_lines, common)
+    suffix = common_length(old_lines, new_lines, common - prefix, from_end=True)
+
+    old_end = len(old_lines) - suffix
+    new_end = len(new_lines) - suffix
+    old_window = old_lines[prefix:old_end]
+    new_window = new_lines[prefix:new_end]
+
+    if not old_window and not new_window:
+        return []
+    if not old_window or not new_window or len(old_window) * len(new_window) > max_diff_window:
+        return [TextEdit(prefix, old_end, new_window)]
+
+    matcher = difflib.SequenceMatcher(None, old_window, new_window, autojunk=False)
+    edits = [
+        TextEdit(prefix + old_start, prefix + old_stop, new_window[new_start:new_stop])
+        for tag, old_start, old_stop, new_start, new_stop in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+    edits.reverse()
+    return edits
+
+
+class IncrementalProgram:
+    """An assembled program that can be edited without reassembling it.
+
+    Instructions are parsed into Instruction records once, when their line is
+    first seen. Their line_number is not updated when an edit above them adds
+    or removes lines.
+
+    Args:
+        source_lines (Iterable[str]): lines of the .asm source
+    """
+
+    def __init__(self, source_lines: Iterable[str]):
+        self.source_lines = list(source_lines)
+        self.clean_lines = [clean_line(line) for line in self.source_lines]
+        self.c_words: dict[str, int] = {}
+        self.assemble()
+
+    @classmethod
+    def from_file(cls, path: str) -> "IncrementalProgram":
+        with open(path, mode="r") as file:
+            return cls(split_lines(file.read()))
+
+    def assemble(self):
+        """Assemble every line from scratch, recording where labels and instructions sit."""
+        symbol_table = SymbolTable(symbol_table_dict_original)
+        instructions = []
+        labels = []
+        # one byte per source line- 1 where that line holds an instruction,
+        # or the first definition of a label
+        instruction_lines = bytearray(len(self.clean_lines))
+        label_lines = bytearray(len(self.clean_lines))
+
+        for line_number, line in enumerate(self.clean_lines):
+            if not line:
+                continue
+
+            if line.startswith("("):
+                label = line.strip("()")
+
+                if not label.isdecimal() and label not in symbol_table:
+                    symbol_table[label] = len(instructions)
+                    labels.append(label)
+                    label_lines[line_number] = 1
+            else:
+                instructions.append(parse_line(line, line_number + 1, self.c_words))
+                instruction_lines[line_number] = 1
+
+        self.symbol_table = symbol_table
+        self.instructions = instructions
+        self.labels = labels
+        self.label_set = set(labels)
+        self.reference_kinds = bytearray(map(self.reference_kind, instructions))
+        self.instruction_lines = instruction_lines
+        self.label_lines = label_lines
+        self.words = encode_instructions(instructions, symbol_table)
+
+    def reference_kind(self, inst: Instruction) -> int:
+        """LABEL_REFERENCE or VARIABLE_REFERENCE for an a-instruction with such a symbol, else 0."""
+        symbol = inst.symbol
+        if symbol is None or symbol in symbol_table_dict_original:
+            return 0
+        return LABEL_REFERENCE if symbol in self.label_set else VARIABLE_REFERENCE
+
+    def iter_references(self, kind: int) -> Iterator[int]:
+        """Indexes of the instructions holding one kind of reference, found by bytearray.find in C."""
+        find = self.reference_kinds.find
+        index = find(kind)
+        while index != -1:
+            yield index
+            index = find(kind, index + 1)
+
+    def reallocate_variables(self) -> dict[str, int]:
+        """Allocate variables again in program order, returning the ones whose address changed."""
+        symbol_table = self.symbol_table
+        old_addresses = {
+            symbol: address
+            for symbol, address in symbol_table.items()
+            if symbol not in symbol_table_dict_original and symbol not in self.label_set
+        }
+
+        for symbol in old_addresses:
+            del symbol_table[symbol]
+        symbol_table.next_variable_address = 16
+
+        # looking each one up allocates it, in program order
+        instructions = self.instructions
+        for index in self.iter_references(VARIABLE_REFERENCE):
+            symbol_table[instructions[index].symbol]
+
+        return {
+            symbol: address
+            for symbol, address in symbol_table.items()
+            if symbol not in symbol_table_dict_original
+            and symbol not in self.label_set
+            and old_addresses.get(symbol) != address
+        }
+
+    def apply_edit(self, start: int, end: int, new_lines: list[str]):
+        """Replace source lines [start, end) with new_lines and bring the words up to date.
+
+        Edits that add or remove label definitions reassemble from scratch.
+        Other edits re-encode only the new lines. If the instruction count
+        changes, the labels after the edit move, and so do any variables
+        whose first use moved. Only the a-instructions that refer to a label
+        or variable are visited to patch them, found through reference_kinds
+        without a Python loop over the whole program.
+        """
+        new_clean = [clean_line(line) for line in new_lines]
+        old_clean = self.clean_lines[start:end]
+
+        self.source_lines[start:end] = new_lines
+        self.clean_lines[start:end] = new_clean
+
+        if any(line.startswith("(") for line in old_clean) or any(
+            line.startswith("(") for line in new_clean
+        ):
+            self.assemble()
+            return
+
+        first = self.instruction_lines.count(1, 0, start)
+        stop = first + self.instruction_lines.count(1, start, end)
+        new_instructions = [
+            parse_line(line, start + offset + 1, self.c_words)
+            for offset, line in enumerate(new_clean)
+            if line
+        ]
+        shift = len(new_instructions) - (stop - first)
+
+        self.instruction_lines[start:end] = bytes(1 if line else 0 for line in new_clean)
+        self.label_lines[start:end] = bytes(len(new_clean))
+        self.instructions[first:stop] = new_instructions
+        new_kinds = bytes(map(self.reference_kind, new_instructions))
+        touches_variable = (
+            VARIABLE_REFERENCE in self.reference_kinds[first:stop]
+            or VARIABLE_REFERENCE in new_kinds
+        )
+        self.reference_kinds[first:stop] = new_kinds
+
+        symbol_table = self.symbol_table
+        moved_labels = {}
+        moved_variables = {}
+
+        if shift:
+            # only labels defined after the edit move
+            for label in self.labels[self.label_lines.count(1, 0, start) :]:
+                address = symbol_table[label] + shift
+                symbol_table[label] = address
+                moved_labels[label] = address
+
+        if touches_variable:
+            moved_variables = self.reallocate_variables()
+
+        self.words[first:stop] = encode_instructions(new_instructions, symbol_table)
+
+        for moved, kind in [
+            (moved_labels, LABEL_REFERENCE),
+            (moved_variables, VARIABLE_REFERENCE),
+        ]:
+            if not moved:
+                continue
+
+            # a program grown past the end of ROM can push a label out of range
+            if max(moved.values()) > max_constant:
+                check_symbol_range(self.instructions, symbol_table)
+
+            get = moved.get
+            words = self.words
+            instructions = self.instructions
+            for index in self.iter_references(kind):
+                address = get(instructions[index].symbol)
+                if address is not None:
+                    words[index] = address
+
+    def apply_edits(self, edits: Iterable[TextEdit]):
+        """Apply edits in the order given- see diff_edits for the order it produces."""
+        for edit in edits:
+            self.apply_edit(edit.start, edit.end, edit.new_lines)
+
+    def update(self, new_source_lines: list[str]):
+        """Bring the program up to date with a new version of the whole source."""
+        self.apply_edits(diff_edits(self.source_lines, list(new_source_lines)))
+
+    def render(self) -> list[str]:
+        return render_words(self.words)
@@ -0,0 +1,274 @@
+"""
+Separate assembly and linking.
+
+Each .asm unit is assembled on its own into a relocatable object module: its
+words, the labels it defines (as offsets into the module), and a relocation
+entry for every a-instruction whose symbol isn't predefined. Those symbols
+can't be resolved yet, since the module doesn't know where it will be
+placed, or whether the symbol is a label in another module or a variable.
+
+Linking places the modules one after another in ROM, turns each module's
+labels into absolute addresses, and patches every relocation. Symbols that
+no module defines as a label become variables, allocated from 16 in the
+order relocations are met. So linking modules gives the same program as
+assembling their sources joined end to end.
+
+Object modules are saved as JSON next to their source, holding a hash of
+the source they came from, so a build only reassembles units that changed.
+
+    python hack_linker.py Main.asm Sys.asm Memory.asm -o Prog.hack
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from dataclasses import asdict, dataclass, field
+from typing import Iterable, NamedTuple
+
+from hack_assembler import (
+    A_INSTRUCTION,
+    LABEL,
+    SymbolTable,
+    __version__,
+    lex_buffer,
+    max_constant,
+    out_of_range_error,
+    parse_clean_lines,
+    render_words,
+    symbol_table_dict_original,
+    write_hack,
+)
+
+object_extension = ".hackobj"
+object_format_version = 1
+
+
+def source_hash(source: bytes) -> str:
+    """Hash of a unit's source and the assembler version, so either changing invalidates its object."""
+    digest = hashlib.sha256(__version__.encode())
+    digest.update(b"\0")
+    digest.update(source)
+    return digest.hexdigest()
+
+
+@dataclass
+class ObjectModule:
+    """One separately assembled unit.
+
+    words holds 0 wherever a relocation will patch in an address.
+    """
+
+    name: str
+    words: list[int]
+    # label -> address, counted from the start of this module
+    labels: dict[str, int] = field(default_factory=dict)
+    # (word index, symbol) for every a-instruction still to be resolved, in program order
+    relocations: list[tuple[int, str]] = field(default_factory=list)
+    source_hash: str = ""
+
+    def to_dict(self) -> dict:
+        report = asdict(self)
+        report["format_version"] = object_format_version
+        return report
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ObjectModule":
+        if data.get("format_version") != object_format_version:
+            raise ValueError(
+                f"object module '{data.get('name')}' has format version "
+                f"{data.get('format_version')}, expected {object_format_version}"
+            )
+        return cls(
+            data["name"],
+            data["words"],
+            data["labels"],
+            [(index, symbol) for index, symbol in data["relocations"]],
+            data["source_hash"],
+        )
+
+    def write(self, path: str):
+        with open(path, "w") as object_file:
+            json.dump(self.to_dict(), object_file)
+
+    @classmethod
+    def read(cls, path: str) -> "ObjectModule":
+        with open(path, "r") as object_file:
+            return cls.from_dict(json.load(object_file))
+
+
+def assemble_object(source: bytes, name: str) -> ObjectModule:
+    """Assemble one unit's source into a relocatable object module.
+
+    Args:
+        source (bytes): the unit's .asm source
+        name (str): name to report the module by, usually its path
+
+    Returns:
+        ObjectModule: the unit's words, labels and relocations
+    """
+    words = []
+    labels = {}
+    relocations = []
+
+    for inst in parse_clean_lines(lex_buffer(source)):
+        if inst.kind == LABEL:
+            # same rules as resolve_labels- the first definition wins, predefined names can't be labels
+            label = inst.symbol
+            if (
+                not label.isdecimal()
+                and label not in labels
+                and label not in symbol_table_dict_original
+            ):
+                labels[label] = len(words)
+            continue
+
+        if inst.kind == A_INSTRUCTION and inst.symbol is not None:
+            address = symbol_table_dict_original.get(inst.symbol)
+            if address is None:
+                relocations.append((len(words), inst.symbol))
+                address = 0
+            words.append(address)
+        else:
+            words.append(inst.word)
+
+    return ObjectModule(name, words, labels, relocations, source_hash(source))
+
+
+def link(modules: Iterable[ObjectModule]) -> list[int]:
+    """Place modules one after another in ROM and resolve every relocation.
+
+    Raises:
+        ValueError: if two modules define the same label, or the program doesn't fit in ROM
+    """
+    modules = list(modules)
+    symbol_table = SymbolTable(symbol_table_dict_original)
+    defined_by = {}
+    base = 0
+
+    for module in modules:
+        for label, offset in module.labels.items():
+            if label in defined_by:
+                raise ValueError(
+                    f"label '{label}' defined in both {defined_by[label]} and {module.name}"
+                )
+            defined_by[label] = module.name
+            symbol_table[label] = base + offset
+        base += len(module.words)
+
+    if base > 32768:
+        raise ValueError(f"linked program has {base} instructions, ROM only holds 32768")
+
+    words = []
+    for module in modules:
+        module_words = list(module.words)
+        # undefined symbols are variables, allocated by the symbol table on first lookup
+        for index, symbol in module.relocations:
+            address = symbol_table[symbol]
+            if address > max_constant:
+                raise ValueError(f"{module.name}: {out_of_range_error('@' + symbol)}")
+            module_words[index] = address
+        words.extend(module_words)
+
+    return words
+
+
+def object_path(path: str) -> str:
+    """Where the object module for a source is kept- next to it, with the .hackobj extension."""
+    return os.path.splitext(path)[0] + object_extension
+
+
+class BuildResult(NamedTuple):
+    words: list[int]
+    reassembled: list[str]
+
+
+def load_or_assemble(path: str) -> tuple[ObjectModule, bool]:
+    """Object module for a .asm unit, reassembling it only if its source changed.
+
+    Returns:
+        tuple[ObjectModule, bool]: the module, and whether it had to be reassembled
+    """
+    with open(path, mode="rb") as file:
+        source = file.read()
+
+    saved_path = object_path(path)
+    try:
+        module = ObjectModule.read(saved_path)
+    except (FileNotFoundError, ValueError, KeyError):
+        module = None
+
+    if module is not None and module.source_hash == source_hash(source):
+        return module, False
+
+    module = assemble_object(source, path)
+    module.write(saved_path)
+    return module, True
+
+
+def build(paths: Iterable[str], output_path: str) -> BuildResult:
+    """Assemble changed units, link every unit in the order given, and write the .hack file.
+
+    Args:
+        paths (Iterable[str]): .asm units, or .hackobj object modules, in link order
+        output_path (str): where to write the linked program
+
+    Returns:
+        BuildResult: the linked words, and the units that had to be reassembled
+    """
+    modules = []
+    reassembled = []
+
+    for path in paths:
+        if path.endswith(object_extension):
+            modules.append(ObjectModule.read(path))
+            continue
+
+        module, was_reassembled = load_or_assemble(path)
+        modules.append(module)
+        if was_reassembled:
+            reassembled.append(path)
+
+    words = link(modules)
+    write_hack(output_path, render_words(words))
+    return BuildResult(words, reassembled)
+
+
+def cli(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Assemble Hack units separately and link them into one program."
+    )
+    parser.add_argument(
+        "path",
+        nargs="+",
+        help=".asm units or .hackobj object modules, in the order they go in ROM",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        metavar="PATH",
+        required=True,
+        help="where to write the linked .hack program, or - for standard output",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        result = build(args.path, args.output)
+    except (KeyError, ValueError) as error:
+        print(f"error: {error.args[0]}", file=sys.stderr)
+        return 1
+    except OSError as error:
+        print(f"error: {error}", file=sys.stderr)
+        return 1
+
+    print(
+        f"linked {len(args.path)} modules into {len(result.words)} instructions, "
+        f"reassembled {len(result.reassembled)}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,196 @@
+"""
+Peephole optimizer for Hack programs.
+
+Works on the parsed program, labels still in place, so label addresses are
+worked out afresh by resolve_labels afterwards. It only removes or rewrites
+instructions whose removal can't change what the program does, from any
+entry point. Every label starts a new block, since a jump can land on it.
+
+    - rewrites of known VM stack round trips, like pushing D and popping it
+      straight back, into the few instructions that have the same effect
+    - a jump with no dest whose target is the very next instruction
+    - an a-instruction whose value is overwritten by the next instruction
+      before anything reads it
+    - an a-instruction loading the value A already holds
+
+The first reference to each variable is always kept, even when it's dead.
+Variables get their addresses in the order they're first referenced, so
+dropping one would move every variable after it in RAM.
+"""
+
+from typing import NamedTuple
+
+from hack_assembler import (
+    A_INSTRUCTION,
+    C_INSTRUCTION,
+    LABEL,
+    Instruction,
+    parse_line,
+    symbol_table_dict_original,
+)
+
+# instruction sequences and shorter ones with exactly the same effect on A, D and RAM-
+# only matched within a block, so nothing can jump into the middle of one
+stack_rewrites_dict = {
+    # push D then pop into D- RAM[0] ends where it started, RAM[SP] holds D and A is SP
+    ("@SP", "AM=M+1", "A=A-1", "M=D", "@SP", "AM=M-1", "D=M"): ("@SP", "A=M", "M=D"),
+    ("@SP", "M=M+1", "A=M-1", "M=D", "@SP", "AM=M-1", "D=M"): ("@SP", "A=M", "M=D"),
+    # decrement then increment SP, or the other way round
+    ("@SP", "AM=M-1", "@SP", "AM=M+1"): ("@SP", "A=M"),
+    ("@SP", "AM=M+1", "@SP", "AM=M-1"): ("@SP", "A=M"),
+    ("@SP", "M=M-1", "@SP", "M=M+1"): ("@SP",),
+    ("@SP", "M=M+1", "@SP", "M=M-1"): ("@SP",),
+}
+stack_rewrite_lengths = sorted({len(pattern) for pattern in stack_rewrites_dict}, reverse=True)
+
+
+class OptimizationResult(NamedTuple):
+    program: list[Instruction]
+    instructions_removed: int
+
+
+def instruction_count(program: list[Instruction]) -> int:
+    return sum(1 for inst in program if inst.kind != LABEL)
+
+
+def a_value(inst: Instruction) -> int | str:
+    """What an a-instruction loads- predefined symbols as their address, so @SP and @0 match."""
+    if inst.symbol is None:
+        return inst.word
+    return symbol_table_dict_original.get(inst.symbol, inst.symbol)
+
+
+def writes_a(inst: Instruction) -> bool:
+    dest, equals, _ = inst.text.partition("=")
+    return bool(equals) and "A" in dest
+
+
+def is_plain_jump(inst: Instruction) -> bool:
+    """A c-instruction that only jumps- no dest, so it changes no register or memory."""
+    return "=" not in inst.text and ";" in inst.text
+
+
+def rewrite_stack_round_trips(program: list[Instruction]) -> list[Instruction]:
+    optimized = []
+    append = optimized.append
+    texts = [inst.text for inst in program]
+    index = 0
+
+    while index < len(program):
+        inst = program[index]
+
+        if texts[index] == "@SP":
+            for length in stack_rewrite_lengths:
+                replacement = stack_rewrites_dict.get(tuple(texts[index : index + length]))
+                if replacement is not None:
+                    optimized.extend(
+                        parse_line(text, inst.line_number) for text in replacement
+                    )
+                    index += length
+                    break
+            else:
+                append(inst)
+                index += 1
+            continue
+
+        append(inst)
+        index += 1
+
+    return optimized
+
+
+def remove_jumps_to_next(program: list[Instruction]) -> list[Instruction]:
+    optimized = []
+
+    for index, inst in enumerate(program):
+        if inst.kind == C_INSTRUCTION and is_plain_jump(inst) and index:
+            previous = program[index - 1]
+
+            if previous.kind == A_INSTRUCTION and previous.symbol is not None:
+                # labels between here and the next instruction all name its address
+                following = index + 1
+                while following < len(program) and program[following].kind == LABEL:
+                    if program[following].symbol == previous.symbol:
+                        break
+                    following += 1
+                else:
+                    following = None
+
+                if following is not None:
+                    continue
+
+        optimized.append(inst)
+
+    return optimized
+
+
+def remove_dead_loads(program: list[Instruction]) -> list[Instruction]:
+    optimized = []
+    # value A is known to hold at this point, or None after a label or a write to A
+    known = None
+    labels = {inst.symbol for inst in program if inst.kind == LABEL}
+    seen_variables = set()
+
+    for index, inst in enumerate(program):
+        kind = inst.kind
+
+        if kind == LABEL:
+            known = None
+        elif kind == A_INSTRUCTION:
+            value = a_value(inst)
+            symbol = inst.symbol
+            if (
+                symbol is not None
+                and symbol not in seen_variables
+                and symbol not in labels
+                and symbol not in symbol_table_dict_original
+            ):
+                # the first reference allocates the variable's address, so it has to stay
+                seen_variables.add(symbol)
+                known = value
+                optimized.append(inst)
+                continue
+
+            if value == known:
+                continue
+
+            # overwritten before use if the next instruction, labels or not, is another load
+            following = index + 1
+            while following < len(program) and program[following].kind == LABEL:
+                following += 1
+            if following < len(program) and program[following].kind == A_INSTRUCTION:
+                continue
+
+            known = value
+        elif writes_a(inst):
+            known = None
+
+        optimized.append(inst)
+
+    return optimized
+
+
+def optimize_program(program: list[Instruction]) -> OptimizationResult:
+    """Remove provably redundant instructions, repeating until nothing more can go.
+
+    Args:
+        program (list[Instruction]): parsed program, labels included- see parse_program
+
+    Returns:
+        OptimizationResult: the optimized program, labels still in place, and how many
+            instructions were removed
+    """
+    count = instruction_count(program)
+    original_count = count
+
+    while True:
+        program = rewrite_stack_round_trips(program)
+        program = remove_jumps_to_next(program)
+        program = remove_dead_loads(program)
+
+        new_count = instruction_count(program)
+        if new_count == count:
+            break
+        count = new_count
+
+    return OptimizationResult(program, original_count - count)
@@ -0,0 +1,308 @@
+"""
+Macro and include preprocessor, run on a source before it's cleaned and parsed.
+
+Directives are lines starting with #, which plain Hack assembly never uses:
+
+    #include "runtime.asm"      paste in another file, relative to this one
+    #macro PUSH_CONST value     define a macro with parameters...
+        @{value}
+        D=A
+        @SP
+        AM=M+1
+        A=A-1
+        M=D
+    #end                        ...up to here
+    #PUSH_CONST 7               expand a macro, arguments separated by spaces
+
+Parameters are substituted wherever {name} appears in the body. A macro body
+can expand macros defined before it. Labels inside a macro are the same on
+every expansion, so a macro that needs its own label should take the label
+name as an argument.
+
+A file is pasted in at most once per program, so two files that both
+include the same library (a diamond) don't define its macros twice. An
+include cycle is still an error.
+
+Included files are parsed once per distinct content, and each macro is
+expanded once per distinct set of arguments. Both caches are keyed by
+content, not by path, are bounded, and live as long as the process does.
+A batch worker or the server handling hundreds of files that include the
+same runtime library parses that library once. The main program isn't
+cached- it's parsed once anyway, and keeping it would only keep its text
+alive.
+
+    python hack_preprocessor.py Main.asm
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+from collections import OrderedDict
+from functools import lru_cache
+from typing import NamedTuple
+
+from hack_assembler import split_lines
+
+
+class Include(NamedTuple):
+    path: str
+    line_number: int
+
+
+class Call(NamedTuple):
+    name: str
+    arguments: tuple[str, ...]
+    line_number: int
+
+
+class Macro(NamedTuple):
+    """A macro definition. Calls in its body are bound to the macros they name when it's defined."""
+
+    name: str
+    parameters: tuple[str, ...]
+    # plain lines, or (Macro, arguments) for a call
+    body: tuple
+
+
+class Definition(NamedTuple):
+    name: str
+    parameters: tuple[str, ...]
+    # plain lines, or Call
+    body: tuple
+    line_number: int
+
+
+class ParsedSource(NamedTuple):
+    """One file, split into plain lines and directives- plain lines, Include, Call or Definition."""
+
+    items: tuple
+
+
+def directive_text(line: str) -> str:
+    """A directive line without its leading # and any comment."""
+    return line.partition("//")[0].strip()[1:].strip()
+
+
+def parse_source(source: str) -> ParsedSource:
+    """Split a source into plain lines and directives.
+
+    Raises:
+        ValueError: for a malformed directive, naming the line
+    """
+    items = []
+    # name, parameters and start line of the macro being defined, and its body so far
+    header = None
+    body = []
+
+    lines = split_lines(source)
+    if not lines[-1]:
+        # the empty string after the last line break, not a line of its own
+        lines.pop()
+
+    for line_number, line in enumerate(lines, 1):
+        target = body if header is not None else items
+
+        if not line.lstrip().startswith("#"):
+            target.append(line)
+            continue
+
+        directive, _, rest = directive_text(line).partition(" ")
+        arguments = tuple(rest.split())
+
+        if directive == "macro":
+            if header is not None:
+                raise ValueError(f"line {line_number}: macros can't be defined inside a macro")
+            if not arguments:
+                raise ValueError(f"line {line_number}: #macro needs a name")
+            header = (arguments[0], arguments[1:], line_number)
+            body = []
+        elif directive == "end":
+            if header is None:
+                raise ValueError(f"line {line_number}: #end without #macro")
+            items.append(Definition(*header[:2], tuple(body), header[2]))
+            header = None
+        elif directive == "include":
+            if header is not None:
+                raise ValueError(f"line {line_number}: #include can't be used inside a macro")
+            items.append(Include(rest.strip().strip('"'), line_number))
+        elif directive:
+            target.append(Call(directive, arguments, line_number))
+        else:
+            raise ValueError(f"line {line_number}: empty directive")
+
+    if header is not None:
+        raise ValueError(f"line {header[2]}: #macro {header[0]} has no #end")
+
+    return ParsedSource(tuple(items))
+
+
+# parsed included files by a hash of their content, least recently used first
+included_cache: OrderedDict[bytes, ParsedSource] = OrderedDict()
+included_cache_size = 256
+
+
+def parse_included(source: str) -> ParsedSource:
+    """parse_source for an included file, cached by a hash of its content."""
+    key = hashlib.sha256(source.encode()).digest()
+    parsed = included_cache.get(key)
+    if parsed is not None:
+        included_cache.move_to_end(key)
+        return parsed
+
+    parsed = parse_source(source)
+    included_cache[key] = parsed
+    if len(included_cache) > included_cache_size:
+        included_cache.popitem(last=False)
+    return parsed
+
+
+@lru_cache(maxsize=4096)
+def expand_macro(macro: Macro, arguments: tuple[str, ...]) -> tuple[str, ...]:
+    """The lines a call expands to, nested calls included. Cached per macro and arguments."""
+    if len(arguments) != len(macro.parameters):
+        raise ValueError(
+            f"macro {macro.name} takes {len(macro.parameters)} arguments, got {len(arguments)}"
+        )
+
+    replacements = [
+        (f"{{{parameter}}}", argument)
+        for parameter, argument in zip(macro.parameters, arguments)
+    ]
+
+    def substitute(text: str) -> str:
+        for placeholder, argument in replacements:
+            text = text.replace(placeholder, argument)
+        return text
+
+    lines = []
+    for item in macro.body:
+        if isinstance(item, str):
+            lines.append(substitute(item))
+        else:
+            inner, inner_arguments = item
+            lines.extend(expand_macro(inner, tuple(map(substitute, inner_arguments))))
+
+    return tuple(lines)
+
+
+class Preprocessor:
+    """Expands one program- the macros it has seen, and the files it is inside or has pasted in."""
+
+    def __init__(self):
+        self.macros: dict[str, Macro] = {}
+        self.include_stack: list[str] = []
+        self.included: set[str] = set()
+
+    def define(self, definition: Definition, name: str) -> Macro:
+        if definition.name in self.macros:
+            raise ValueError(
+                f"{name}:{definition.line_number}: macro {definition.name} is already defined"
+            )
+        if definition.name in ("macro", "end", "include"):
+            raise ValueError(
+                f"{name}:{definition.line_number}: {definition.name} is a directive name"
+            )
+
+        body = []
+        for item in definition.body:
+            if isinstance(item, Call):
+                # bound now, so the macro means the same wherever it's expanded
+                body.append((self.lookup(item, name), item.arguments))
+            else:
+                body.append(item)
+
+        macro = Macro(definition.name, definition.parameters, tuple(body))
+        self.macros[definition.name] = macro
+        return macro
+
+    def lookup(self, call: Call, name: str) -> Macro:
+        try:
+            return self.macros[call.name]
+        except KeyError:
+            raise ValueError(
+                f"{name}:{call.line_number}: unknown directive or macro '#{call.name}'"
+            ) from None
+
+    def expand_file(self, path: str) -> list[str]:
+        with open(path, mode="r") as file:
+            source = file.read()
+        return self.expand(source, path)
+
+    def include(self, path: str) -> list[str]:
+        path = os.path.normpath(path)
+        if path in self.included and path not in self.include_stack:
+            # already pasted in by another file- it's only needed once
+            return []
+
+        with open(path, mode="r") as file:
+            source = file.read()
+        return self.expand(source, path, included=True)
+
+    def expand(self, source: str, path: str = "<source>", included: bool = False) -> list[str]:
+        """Expand a source, reading includes relative to the directory of path."""
+        path = os.path.normpath(path)
+        if path in self.include_stack:
+            chain = " -> ".join([*self.include_stack, path])
+            raise ValueError(f"include cycle: {chain}")
+
+        try:
+            parsed = parse_included(source) if included else parse_source(source)
+        except ValueError as error:
+            raise ValueError(f"{path}: {error}") from None
+
+        self.included.add(path)
+        self.include_stack.append(path)
+        directory = os.path.dirname(path)
+        lines = []
+
+        for item in parsed.items:
+            if isinstance(item, str):
+                lines.append(item)
+            elif isinstance(item, Call):
+                macro = self.lookup(item, path)
+                try:
+                    lines.extend(expand_macro(macro, item.arguments))
+                except ValueError as error:
+                    raise ValueError(f"{path}:{item.line_number}: {error}") from None
+            elif isinstance(item, Include):
+                lines.extend(self.include(os.path.join(directory, item.path)))
+            else:
+                self.define(item, path)
+
+        self.include_stack.pop()
+        return lines
+
+
+def preprocess(source: str, path: str = "<source>") -> list[str]:
+    """Expand the includes and macros of one program.
+
+    Args:
+        source (str): the program's text
+        path (str): where it came from- includes are found relative to it
+
+    Returns:
+        list[str]: plain Hack assembly lines, ready for cleaning and parsing
+    """
+    return Preprocessor().expand(source, path)
+
+
+def cli(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Expand the #include and #macro directives of a Hack assembly program."
+    )
+    parser.add_argument("path", help="path to the .asm source")
+    args = parser.parse_args(argv)
+
+    try:
+        lines = Preprocessor().expand_file(args.path)
+    except (OSError, ValueError) as error:
+        print(f"error: {error}", file=sys.stderr)
+        return 1
+
+    sys.stdout.write("".join(line + "\n" for line in lines))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
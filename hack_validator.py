@@ -0,0 +1,205 @@
+"""
+Whole-program validation, reporting every error instead of stopping at the first.
+
+The assembler raises on the first bad line, which is the right thing for
+valid programs- checking costs nothing until something is wrong. A broken
+generated file, though, would need one run per mistake. validate_program
+makes one pass over the whole program and collects every problem it finds,
+each with its line number in the original source:
+
+    - unknown dest, comp or jump mnemonics
+    - c-instructions with neither "=" nor ";"
+    - constants over 32767, which don't fit in an a-instruction
+    - symbols that aren't valid Hack symbols, like ones starting with a digit
+    - labels defined twice, or named like a predefined symbol
+
+With --preprocess the expanded program is checked, so line numbers count
+lines of the expanded source rather than of the file.
+
+    python hack_validator.py Prog.asm
+"""
+
+import argparse
+import sys
+from typing import Iterable, NamedTuple
+
+from hack_assembler import (
+    clean_line,
+    comp_bits_dict,
+    destination_bits_dict,
+    jump_bits_dict,
+    lex_buffer,
+    max_constant,
+    read_source,
+    symbol_table_dict_original,
+)
+
+# characters a symbol may be made of, besides letters and digits
+symbol_punctuation = set("_.$:")
+
+
+class AssemblyError(NamedTuple):
+    line_number: int
+    text: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"line {self.line_number}: {self.message} in '{self.text}'"
+
+
+def symbol_problem(symbol: str) -> str | None:
+    """Why symbol isn't a valid Hack symbol, or None if it is."""
+    if not symbol:
+        return "missing symbol"
+    if symbol[0].isdigit():
+        return f"symbol '{symbol}' starts with a digit"
+    for character in symbol:
+        if character.isascii() and character.isalnum() or character in symbol_punctuation:
+            continue
+        return f"symbol '{symbol}' contains '{character}'"
+    return None
+
+
+def c_instruction_problems(instruction: str) -> list[str]:
+    """Everything wrong with one c-instruction, in the order the fields are written."""
+    dest_command, equals, comp_and_jump = instruction.partition("=")
+    if not equals:
+        comp_and_jump = dest_command
+        dest_command = None
+
+    comp_command, semicolon, jump_command = comp_and_jump.partition(";")
+    if not semicolon:
+        jump_command = None
+        if not equals:
+            return ["c-instruction lacks both '=' and ';'"]
+
+    problems = []
+    if dest_command not in destination_bits_dict:
+        problems.append(f"unknown dest '{dest_command}'")
+    if comp_command not in comp_bits_dict:
+        problems.append(f"unknown comp '{comp_command}'")
+    if jump_command not in jump_bits_dict:
+        problems.append(f"unknown jump '{jump_command}'")
+    return problems
+
+
+def validate_program(
+    clean_lines: Iterable[str], first_line_number: int = 1
+) -> list[AssemblyError]:
+    """Check a whole program, collecting every error.
+
+    Args:
+        clean_lines (Iterable[str]): one cleaned line per source line, as lex_buffer gives them
+        first_line_number (int): line number of the first line given
+
+    Returns:
+        list[AssemblyError]: every problem found, in source order- empty for a valid program
+    """
+    errors = []
+    label_lines = {}
+    # instructions repeat a lot, so each distinct symbol and c-instruction is only checked once
+    symbol_problems: dict[str, str | None] = {}
+    c_problems: dict[str, list[str]] = {}
+
+    for line_number, text in enumerate(clean_lines, first_line_number):
+        if not text:
+            continue
+
+        first = text[0]
+        if first == "@":
+            command = text[1:]
+            if command.isdecimal():
+                if int(command) > max_constant:
+                    errors.append(
+                        AssemblyError(
+                            line_number, text, f"constant {command} is over {max_constant}"
+                        )
+                    )
+            else:
+                try:
+                    problem = symbol_problems[command]
+                except KeyError:
+                    problem = symbol_problems[command] = symbol_problem(command)
+                if problem is not None:
+                    errors.append(AssemblyError(line_number, text, problem))
+        elif first == "(":
+            if not text.endswith(")") or text.count("(") != 1 or text.count(")") != 1:
+                errors.append(AssemblyError(line_number, text, "malformed label"))
+                continue
+
+            label = text[1:-1]
+            problem = symbol_problem(label)
+            if problem is not None:
+                errors.append(AssemblyError(line_number, text, problem))
+            elif label in symbol_table_dict_original:
+                errors.append(
+                    AssemblyError(line_number, text, f"label {label} is a predefined symbol")
+                )
+            elif label in label_lines:
+                errors.append(
+                    AssemblyError(
+                        line_number,
+                        text,
+                        f"label {label} already defined on line {label_lines[label]}",
+                    )
+                )
+            else:
+                label_lines[label] = line_number
+        else:
+            problems = c_problems.get(text)
+            if problems is None:
+                problems = c_problems[text] = c_instruction_problems(text)
+            for problem in problems:
+                errors.append(AssemblyError(line_number, text, problem))
+
+    return errors
+
+
+def validate_file(path: str, preprocess: bool = False) -> list[AssemblyError]:
+    """Validate a source file, or standard input when path is "-".
+
+    Args:
+        path (str): the .asm source
+        preprocess (bool): expand #include and #macro directives first, and check the result
+
+    Raises:
+        ValueError: if preprocess is set and the directives themselves are broken
+    """
+    source = read_source(path)
+    if not preprocess:
+        return validate_program(lex_buffer(source))
+
+    from hack_preprocessor import preprocess as preprocess_source
+
+    return validate_program(map(clean_line, preprocess_source(source.decode(), path)))
+
+
+def cli(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Check a Hack assembly program, reporting every error at once."
+    )
+    parser.add_argument("path", help="path to the .asm source, or - for standard input")
+    parser.add_argument(
+        "--preprocess",
+        action="store_true",
+        help="expand #include and #macro directives first, line numbers then count expanded lines",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        errors = validate_file(args.path, args.preprocess)
+    except ValueError as error:
+        print(f"error: {error}", file=sys.stderr)
+        return 1
+
+    for error in errors:
+        print(f"{args.path}: {error}", file=sys.stderr)
+
+    if errors:
+        print(f"{len(errors)} errors", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,66 @@
+import json
+import subprocess
+import sys
+
+from hack_analysis import analyze, format_report
+
+small_program = """\
+@i
+M=1
+(LOOP)
+@i
+D=M
+@END
+D;JGT
+@sum
+M=D
+@LOOP
+0;JMP
+(END)
+@END
+0;JMP
+"""
+
+
+class TestAnalyze:
+    def test_regions_references_and_variables(self):
+        report = analyze(small_program.encode(), "Small.asm")
+
+        assert report["rom"]["instructions"] == 12
+        assert report["rom"]["a_instructions"] == 6
+        assert report["regions"] == [
+            {"label": "<start>", "start": 0, "instructions": 2},
+            {"label": "LOOP", "start": 2, "instructions": 8},
+            {"label": "END", "start": 10, "instructions": 2},
+        ]
+        assert report["largest_regions"][0]["label"] == "LOOP"
+        assert report["label_references"] == {"LOOP": 1, "END": 2}
+        assert report["variables"] == {
+            "i": {"address": 16, "references": 2},
+            "sum": {"address": 17, "references": 1},
+        }
+        assert report["ram"]["free_before_screen"] == 16384 - 18
+
+    def test_pong(self):
+        with open("translation_target/Pong.asm", "rb") as file:
+            report = analyze(file.read(), "Pong.asm")
+
+        assert report["rom"]["instructions"] == 27483
+        assert report["rom"]["free"] == 32768 - 27483
+        assert len(report["largest_regions"]) == 10
+        assert sum(region["instructions"] for region in report["regions"]) == 27483
+        assert "Largest regions:" in format_report(report)
+
+    def test_cli_json(self, tmp_path):
+        source_path = tmp_path / "Small.asm"
+        source_path.write_text(small_program)
+
+        completed = subprocess.run(
+            [sys.executable, "hack_analysis.py", str(source_path), "--json", "-"],
+            capture_output=True,
+            check=True,
+        )
+
+        report = json.loads(completed.stdout)
+        assert report["name"] == "Small.asm"
+        assert report["ram"]["variables"] == 2
@@ -1,7 +1,39 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+
 import pytest
 import IPython
 
-from hack_assembler import a_instruction, c_instruction, main
+from hack_assembler import (
+    a_instruction,
+    assemble_batch,
+    assemble_source,
+    collect_asm_paths,
+    assemble_streaming,
+    c_instruction,
+    clean_line,
+    comp_bits_dict,
+    comp_dict,
+    destination_bits_dict,
+    destination_dict,
+    encode_a_instruction,
+    encode_c_instruction,
+    encode_instructions_numpy,
+    jump_bits_dict,
+    jump_dict,
+    lex_buffer,
+    parse_clean_lines,
+    parse_program,
+    main,
+    read_rom,
+    resolve_labels,
+    SymbolTable,
+    WordTextTable,
+)
 
 # use pytest -v -s to eanble IPython embed debugging within a test
 
@@ -83,11 +115,119 @@ class TestCInstruction:
         assert c_instruction("0;JMP") == "1110101010000111"
 
 
+class TestIntegerEncoding:
+    def test_a_instruction_word(self):
+        assert encode_a_instruction("@KBD", {"KBD": 24576}) == 24576
+        assert encode_a_instruction("@21", {}) == 21
+
+    def test_c_instruction_word_matches_string_encoder(self):
+        for instruction in ["D=D+A", "M=-1", "MD=M+1", "D;JGT", "0;JMP", "AMD=D|M;JNE"]:
+            assert format(encode_c_instruction(instruction), "016b") == c_instruction(
+                instruction
+            )
+
+    def test_c_instruction_without_markers_raises(self):
+        with pytest.raises(ValueError):
+            encode_c_instruction("D")
+
+    def test_word_text_memoized_within_16_bits(self):
+        table = WordTextTable()
+        assert table[21] == "0000000000010101"
+        assert table[0b1110_0000_1001_0000] == "1110000010010000"
+        with pytest.raises(ValueError):
+            table[1 << 16]
+        assert sorted(table) == [21, 0b1110_0000_1001_0000]
+
+    def test_a_instruction_over_15_bits_raises(self):
+        with pytest.raises(ValueError, match="'@40000' is out of range"):
+            encode_a_instruction("@40000", {})
+        with pytest.raises(ValueError, match="'@FAR' is out of range"):
+            encode_a_instruction("@FAR", {"FAR": 32768})
+
+
+class TestParseProgram:
+    def test_each_line_parsed_once_into_records(self):
+        program = parse_program(["// comment", "  @21 // constant", "@LOOP", "(LOOP)", "D=D+A"])
+
+        assert [inst.kind for inst in program] == ["A", "A", "L", "C"]
+        assert [inst.line_number for inst in program] == [2, 3, 4, 5]
+        assert program[0].word == 21 and program[0].symbol is None
+        assert program[1].word is None and program[1].symbol == "LOOP"
+        assert program[2].symbol == "LOOP"
+        assert program[3].word == encode_c_instruction("D=D+A")
+
+    def test_error_names_the_line(self):
+        with pytest.raises(KeyError, match="line 2: Q not found"):
+            parse_program(["@1", "D=Q"])
+
+    def test_buffer_lexer_matches_line_by_line(self):
+        source_lines = ["// comment", "  @21 // constant", "", "\t(LOOP)", "D = D + A ; JGT"]
+        buffer = "\r\n".join(source_lines).encode()
+
+        assert lex_buffer(buffer) == ["", "@21", "", "(LOOP)", "D=D+A;JGT"]
+
+        def fields(program):
+            return [(inst.kind, inst.text, inst.line_number, inst.symbol, inst.word) for inst in program]
+
+        assert fields(parse_clean_lines(lex_buffer(buffer))) == fields(parse_program(source_lines))
+
+    @pytest.mark.parametrize(
+        "source",
+        [
+            # U+00A0 is whitespace to the original re.sub(r"\s+"), not part of the constant
+            "@1\u00a0// x\nD=A\n",
+            "@1\x1c\nD=A\x1f\n",
+            # a lone "\r" ends a line, as it did when the source was read with universal newlines
+            "@1\rD=A\r",
+            "@1\r\nD=A\r\n",
+        ],
+    )
+    def test_whitespace_and_line_breaks_match_line_cleaner(self, tmp_path, source):
+        source_path = tmp_path / "Prog.asm"
+        source_path.write_bytes(source.encode())
+
+        expected = ["0000000000000001", "1110110000010000"]
+        assert main(str(source_path), str(tmp_path / "Prog.hack")) == expected
+        assert assemble_source(source) == expected
+        assert lex_buffer(source.encode())[:2] == ["@1", "D=A"]
+
+        assemble_streaming(str(source_path), str(tmp_path / "Streamed.hack"), batch_size=1)
+        assert (tmp_path / "Streamed.hack").read_text().splitlines() == expected
+
+    def test_comment_cut_before_whitespace_deleted(self):
+        # the original cleaner cut "//" comments first, so "/ /" is two slashes, not a comment
+        source = "@2 / / x\n@3 // y\n"
+        assert lex_buffer(source.encode()) == [
+            clean_line(line) for line in source.split("\n")
+        ] == ["@2//x", "@3", ""]
+
+
+class TestSymbolResolution:
+    def test_labels_resolved_and_removed(self):
+        symbol_table = SymbolTable()
+        instructions = resolve_labels(
+            parse_program(
+                ["(START)", "@END", "0;JMP", "(END)", "(ALSO_END)", "@START", "0;JMP"]
+            ),
+            symbol_table,
+        )
+        assert [inst.text for inst in instructions] == ["@END", "0;JMP", "@START", "0;JMP"]
+        assert [inst.line_number for inst in instructions] == [2, 3, 6, 7]
+        assert symbol_table == {"START": 0, "END": 2, "ALSO_END": 2}
+
+    def test_variables_allocated_on_first_lookup(self):
+        symbol_table = SymbolTable({"R0": 0})
+        assert encode_a_instruction("@i", symbol_table) == 16
+        assert encode_a_instruction("@sum", symbol_table) == 17
+        assert encode_a_instruction("@i", symbol_table) == 16
+        assert encode_a_instruction("@R0", symbol_table) == 0
+
+
 class TestHackAssemblerNoSymbols:
     # To run just this class- syntax
     #  pytest hack_assembler/test/test_hack_assembler.py::TestHackAssembler
-    def test_add(self):
-        result_add = main("translation_target/Add.asm")
+    def test_add(self, tmp_path):
+        result_add = main("translation_target/Add.asm", str(tmp_path / "Prog.hack"))
         assert isinstance(result_add, list)
         assert len(result_add) == 6
         # result as code: ["@2", "D=A", "@3", "D=D+A", "@0", "M=D"]
@@ -106,7 +246,7 @@ class TestHackAssemblerNoSymbols:
                 expected == result_add[i]
             ), f"line {i} expected {expected} but got actual {result_add[i]}"
 
-    def test_maxl(self):
+    def test_maxl(self, tmp_path):
         # ['@0', 'D=M', '@1', 'D=D-M', '@10', 'D;JGT', '@1', 'D=M', '@12', '0;JMP', '@0', 'D=M', '@2', 'M=D', '@14', '0;JMP']
         # Encodings:
         # 1 1 1 a c1 c2 c3 c4 c5 c6 d1 d2 d3 j1 j2 j3
@@ -115,7 +255,7 @@ class TestHackAssemblerNoSymbols:
 
         # ipdb.set_trace()
 
-        result_max = main("translation_target/MaxL.asm")
+        result_max = main("translation_target/MaxL.asm", str(tmp_path / "Prog.hack"))
         assert isinstance(result_max, list)
 
         assert len(result_max) == 16
@@ -161,8 +301,11 @@ class TestHackAssemblerNoSymbols:
                 expected == result_max[i]
             ), f"line {i} expected {expected} but got actual {result_max[i]}"
 
-    def test_output_written_in_file_add(self):
-        result_add = main("translation_target/Add.asm")
+    def test_output_written_in_file_add(self, tmp_path):
+        # Prog.hack next to the source, as the contract says- on a copy, so the
+        # repo's translation_target stays clean
+        shutil.copy("translation_target/Add.asm", tmp_path / "Add.asm")
+        result_add = main(str(tmp_path / "Add.asm"))
         assert isinstance(result_add, list)
         assert len(result_add) == 6
         # result as code: ["@2", "D=A", "@3", "D=D+A", "@0", "M=D"]
@@ -175,16 +318,16 @@ class TestHackAssemblerNoSymbols:
             "1110001100001000",
         ]
 
-        with open("translation_target/Prog.hack", "r") as output_file:
+        with open(tmp_path / "Prog.hack", "r") as output_file:
             for i, line in enumerate(output_file):
                 assert (
                     line.removesuffix("\n") == result_add[i]
                 ), f"line {i} expected {result_add[i]} but got actual {line.removesuffix("\n")}"
 
-    def test_rectl(self):
-        main("translation_target/RectL.asm")
+    def test_rectl(self, tmp_path):
+        main("translation_target/RectL.asm", str(tmp_path / "Prog.hack"))
 
-        output_file = open("translation_target/Prog.hack", "r")
+        output_file = open(tmp_path / "Prog.hack", "r")
         output_lines = output_file.readlines()
         output_file.close()
 
@@ -201,10 +344,10 @@ class TestHackAssemblerNoSymbols:
                     actual == expected
                 ), f"line {i} expected {expected} but got actual {actual}"
 
-    def test_pongl(self):
-        main("translation_target/PongL.asm")
+    def test_pongl(self, tmp_path):
+        main("translation_target/PongL.asm", str(tmp_path / "Prog.hack"))
 
-        output_file = open("translation_target/Prog.hack", "r")
+        output_file = open(tmp_path / "Prog.hack", "r")
         output_lines = output_file.readlines()
         output_file.close()
 
@@ -224,9 +367,9 @@ class TestHackAssemblerNoSymbols:
 
 class TestHackAssemblerWithSymbols:
     # @pytest.mark.skip(reason="skipping to focus on other smaller test for now")
-    def test_max(self):
+    def test_max(self, tmp_path):
 
-        result_max = main("translation_target/Max.asm")
+        result_max = main("translation_target/Max.asm", str(tmp_path / "Prog.hack"))
         assert isinstance(result_max, list)
 
         assert len(result_max) == 16
@@ -256,10 +399,10 @@ class TestHackAssemblerWithSymbols:
             ), f"line {i} expected {expected} but got actual {result_max[i]}"
 
     # @pytest.mark.skip(reason="skipping to focus on other smaller test for now")
-    def test_rect(self):
-        main("translation_target/Rect.asm")
+    def test_rect(self, tmp_path):
+        main("translation_target/Rect.asm", str(tmp_path / "Prog.hack"))
 
-        output_file = open("translation_target/Prog.hack", "r")
+        output_file = open(tmp_path / "Prog.hack", "r")
         output_lines = output_file.readlines()
         output_file.close()
 
@@ -277,10 +420,10 @@ class TestHackAssemblerWithSymbols:
                 ), f"line {i} expected {expected} but got actual {actual}"
 
     # @pytest.mark.skip(reason="skipping to focus on other smaller test for now")
-    def test_pong(self):
-        main("translation_target/Pong.asm")
+    def test_pong(self, tmp_path):
+        main("translation_target/Pong.asm", str(tmp_path / "Prog.hack"))
 
-        output_file = open("translation_target/Prog.hack", "r")
+        output_file = open(tmp_path / "Prog.hack", "r")
         output_lines = output_file.readlines()
         output_file.close()
 
@@ -296,3 +439,265 @@ class TestHackAssemblerWithSymbols:
                 assert (
                     actual == expected
                 ), f"line {i} expected {expected} but got actual {actual}"
+
+
+class TestStreamingAssembly:
+    @pytest.mark.parametrize(
+        "source, expected",
+        [
+            ("translation_target/Rect.asm", "translation_target/Rect_test_expected.hack"),
+            ("translation_target/Pong.asm", "translation_target/Pong_test_expected.hack"),
+        ],
+    )
+    def test_matches_expected(self, tmp_path, source, expected):
+        output_path = tmp_path / "Prog.hack"
+        # small batches so the label/variable state has to carry across them
+        instruction_count = assemble_streaming(source, str(output_path), batch_size=100)
+
+        with open(expected, "r") as expected_output_file:
+            expected_output_lines = expected_output_file.read().splitlines()
+
+        assert output_path.read_text().splitlines() == expected_output_lines
+        assert instruction_count == len(expected_output_lines)
+
+
+class TestBatchAssembly:
+    def test_each_file_gets_its_own_output(self, tmp_path):
+        for name in ["Add.asm", "Max.asm", "Rect.asm"]:
+            shutil.copy(f"translation_target/{name}", tmp_path / name)
+        (tmp_path / "Broken.asm").write_text("@2\nD=Q\n")
+
+        paths = collect_asm_paths([str(tmp_path)])
+        results = assemble_batch(paths, max_workers=2)
+
+        assert [os.path.basename(result.path) for result in results] == [
+            "Add.asm",
+            "Broken.asm",
+            "Max.asm",
+            "Rect.asm",
+        ]
+        assert [result.error is None for result in results] == [True, False, True, True]
+        assert "Q not found" in results[1].error
+
+        with open("translation_target/Rect_test_expected.hack", "r") as expected_output_file:
+            expected_output_lines = expected_output_file.read().splitlines()
+        assert (tmp_path / "Rect.hack").read_text().splitlines() == expected_output_lines
+        assert (tmp_path / "Add.hack").exists()
+        assert not (tmp_path / "Prog.hack").exists()
+
+    def test_options_apply_to_every_file(self, tmp_path):
+        shutil.copy("translation_target/Pong.asm", tmp_path / "Pong.asm")
+        (tmp_path / "Main.asm").write_text("#macro ONE\n@1\nD=A\n#end\n#ONE\n")
+
+        completed = subprocess.run(
+            [
+                sys.executable,
+                "hack_assembler.py",
+                str(tmp_path),
+                "--batch",
+                "--jobs",
+                "1",
+                "--preprocess",
+                "--optimize",
+                "--stats-json",
+                str(tmp_path / "stats.json"),
+            ],
+            capture_output=True,
+        )
+
+        assert completed.returncode == 0, completed.stdout
+        reports = json.loads((tmp_path / "stats.json").read_text())
+        assert [os.path.basename(report["path"]) for report in reports] == ["Main.asm", "Pong.asm"]
+        assert reports[0]["a_instructions"] == 1
+        assert reports[1]["instructions_removed"] > 0
+
+    @pytest.mark.parametrize("flag", ["--stream", "--verbose", "--self-test-timing"])
+    def test_batch_rejects_options_it_ignores(self, tmp_path, flag):
+        shutil.copy("translation_target/Add.asm", tmp_path / "Add.asm")
+        completed = subprocess.run(
+            [sys.executable, "hack_assembler.py", str(tmp_path), "--batch", flag],
+            capture_output=True,
+        )
+
+        assert completed.returncode == 2
+        assert f"--batch can't be used with {flag}" in completed.stderr.decode()
+        assert not (tmp_path / "Add.hack").exists()
+
+    @pytest.mark.parametrize("flag", ["--cache", "--stats", "--optimize", "--numpy", "--verbose"])
+    def test_stream_rejects_options_it_ignores(self, flag):
+        completed = subprocess.run(
+            [sys.executable, "hack_assembler.py", "translation_target/Add.asm", "--stream", flag],
+            capture_output=True,
+        )
+
+        assert completed.returncode == 2
+        assert f"--stream can't be used with {flag}" in completed.stderr.decode()
+
+
+class TestRomOutput:
+    @pytest.mark.parametrize("output_format, byteorder", [("rom-le", "little"), ("rom-be", "big")])
+    def test_rom_matches_text_output(self, tmp_path, output_format, byteorder):
+        output_path = tmp_path / "Prog.bin"
+        rom = main(
+            "translation_target/Rect.asm",
+            str(output_path),
+            output_format=output_format,
+        )
+
+        with open("translation_target/Rect_test_expected.hack", "r") as expected_output_file:
+            expected_words = [int(line, 2) for line in expected_output_file.read().splitlines()]
+
+        assert rom.typecode == "H"
+        assert list(rom) == expected_words
+        assert output_path.stat().st_size == 2 * len(expected_words)
+        assert list(read_rom(str(output_path), byteorder)) == expected_words
+        assert output_path.read_bytes()[:2] == expected_words[0].to_bytes(2, byteorder)
+
+
+class TestNumpyEncoding:
+    def test_matches_expected(self, tmp_path):
+        pytest.importorskip("numpy")
+        output_path = tmp_path / "Prog.hack"
+        result = main("translation_target/Pong.asm", str(output_path), use_numpy=True)
+
+        with open("translation_target/Pong_test_expected.hack", "r") as expected_output_file:
+            expected_output_lines = expected_output_file.read().splitlines()
+        assert result == expected_output_lines
+        assert output_path.read_text().splitlines() == expected_output_lines
+
+    def test_out_of_range_label(self):
+        pytest.importorskip("numpy")
+        with pytest.raises(ValueError, match="line 3: a-instruction '@FAR' is out of range"):
+            encode_instructions_numpy(parse_program(["@1", "D=A", "@FAR"]), SymbolTable(FAR=40000))
+
+    def test_falls_back_without_numpy(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("hack_assembler.load_numpy", lambda: None)
+        result = main("translation_target/Add.asm", str(tmp_path / "Prog.hack"), use_numpy=True)
+        assert len(result) == 6
+
+
+class TestInMemoryAssembly:
+    def test_text_and_lines(self, tmp_path, monkeypatch):
+        # nothing may be written, so run somewhere a stray Prog.hack would show up
+        monkeypatch.chdir(tmp_path)
+        source = "// adds 2 and 3\n@2\nD=A\n@3\nD=D+A\n@0\nM=D\n"
+
+        assert assemble_source(source) == [
+            "0000000000000010",
+            "1110110000010000",
+            "0000000000000011",
+            "1110000010010000",
+            "0000000000000000",
+            "1110001100001000",
+        ]
+        assert assemble_source(iter(source.splitlines())) == assemble_source(source)
+        assert list(tmp_path.iterdir()) == []
+
+    def test_cli_stdin_to_stdout(self):
+        with open("translation_target/Rect.asm", "rb") as file:
+            source = file.read()
+
+        completed = subprocess.run(
+            [sys.executable, "hack_assembler.py", "-"],
+            input=source,
+            capture_output=True,
+            check=True,
+        )
+
+        with open("translation_target/Rect_test_expected.hack", "r") as expected_output_file:
+            expected_output_lines = expected_output_file.read().splitlines()
+        assert completed.stdout.decode().splitlines() == expected_output_lines
+
+    def test_cli_explicit_output_path(self, tmp_path):
+        output_path = tmp_path / "Add.hack"
+        completed = subprocess.run(
+            [sys.executable, "hack_assembler.py", "translation_target/Add.asm", "-o", str(output_path)],
+            capture_output=True,
+            check=True,
+        )
+        assert completed.stdout == b""
+        assert len(output_path.read_text().splitlines()) == 6
+
+
+class TestColdStart:
+    def test_integer_tables_match_string_tables(self):
+        assert comp_bits_dict == {comp: int(bits, 2) << 6 for comp, bits in comp_dict.items()}
+        assert destination_bits_dict == {
+            dest: int(bits, 2) << 3 for dest, bits in destination_dict.items()
+        }
+        assert jump_bits_dict == {jump: int(bits, 2) for jump, bits in jump_dict.items()}
+
+    def test_import_skips_heavy_modules(self):
+        completed = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, hack_assembler; "
+                "print(sorted({'argparse', 'concurrent.futures', 'dataclasses', 'glob', "
+                "'hack_cache', 'json', 're', 'typing'} & set(sys.modules)))",
+            ],
+            capture_output=True,
+            check=True,
+        )
+        assert completed.stdout.decode().strip() == "[]"
+
+    def test_one_file_skips_argument_parsing(self, tmp_path):
+        shutil.copy("translation_target/Add.asm", tmp_path / "Add.asm")
+        completed = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, hack_assembler; "
+                f"hack_assembler.cli([{str(tmp_path / 'Add.asm')!r}]); "
+                "print('argparse' in sys.modules)",
+            ],
+            capture_output=True,
+            check=True,
+        )
+        assert completed.stdout.decode().strip() == "False"
+        expected = main(str(tmp_path / "Add.asm"), str(tmp_path / "Expected.hack"))
+        assert (tmp_path / "Prog.hack").read_text().splitlines() == expected
+
+    def test_self_test_timing(self, tmp_path):
+        completed = subprocess.run(
+            [
+                sys.executable,
+                "hack_assembler.py",
+                "translation_target/Add.asm",
+                "-o",
+                str(tmp_path / "Add.hack"),
+                "--self-test-timing",
+            ],
+            capture_output=True,
+            check=True,
+        )
+        assert re.fullmatch(
+            r"import [\d.]+ms, argument parsing [\d.]+ms, assembly [\d.]+ms\n",
+            completed.stderr.decode(),
+        )
+
+
+class TestOutOfRange:
+    @pytest.mark.parametrize(
+        "options",
+        [{}, {"output_format": "rom-le"}, {"use_numpy": True}, {"optimize": True}],
+    )
+    def test_constant_over_15_bits(self, tmp_path, options):
+        source_path = tmp_path / "Big.asm"
+        source_path.write_text("@1\nD=A\n@40000\nD=D+A\n")
+
+        with pytest.raises(ValueError, match="line 3: a-instruction '@40000' is out of range"):
+            main(str(source_path), str(tmp_path / "Prog.out"), **options)
+        assert not (tmp_path / "Prog.out").exists()
+
+    @pytest.mark.parametrize("streaming", [False, True])
+    def test_label_past_end_of_rom(self, tmp_path, streaming):
+        # 32768 instructions fill ROM, so a label after them is at 32768
+        source_path = tmp_path / "Big.asm"
+        source_path.write_text("@END\n" + "D=A\n" * 32767 + "(END)\n")
+
+        with pytest.raises(ValueError, match="line 1: a-instruction '@END' is out of range"):
+            if streaming:
+                assemble_streaming(str(source_path), str(tmp_path / "Prog.hack"))
+            else:
+                main(str(source_path), str(tmp_path / "Prog.hack"))
@@ -0,0 +1,46 @@
+import json
+
+from hack_assembler import SymbolTable, assemble_words, main, symbol_table_dict_original
+from hack_benchmark import benchmark_incremental_edit, generate_program, phases, run_benchmarks
+
+
+class TestGenerateProgram:
+    def test_program_assembles(self, tmp_path):
+        lines = generate_program(2000, label_ratio=0.1, variable_ratio=0.2, c_ratio=0.4, seed=3)
+
+        symbol_table = SymbolTable(symbol_table_dict_original)
+        words = assemble_words(lines, symbol_table)
+
+        # predefined symbols like SP, KBD and R13 resolve to their own addresses
+        added = set(symbol_table) - set(symbol_table_dict_original)
+        assert all(symbol.startswith(("LABEL_", "var_")) for symbol in added)
+        assert any(line.strip() == "@KBD" for line in lines)
+
+        source_path = tmp_path / "Generated.asm"
+        source_path.write_text("\n".join(lines) + "\n")
+        assert main(str(source_path)) == [f"{word:016b}" for word in words]
+
+        assert len(words) == 2000
+        assert sum(1 for line in lines if line.startswith("(")) == 200
+        c_count = sum(1 for word in words if word >= 0xE000)
+        assert 600 < c_count < 1000
+
+    def test_same_seed_same_program(self):
+        assert generate_program(500, seed=7) == generate_program(500, seed=7)
+        assert generate_program(500, seed=7) != generate_program(500, seed=8)
+
+
+class TestRunBenchmarks:
+    def test_report_is_json(self):
+        report = run_benchmarks([300], repeat=1, include_bundled=False)
+
+        (result,) = json.loads(json.dumps(report))["results"]
+        assert result["name"] == "synthetic-300"
+        assert result["instructions"] == 300
+        assert set(result["phases"]) == set(phases)
+
+    def test_incremental_edit_timed(self):
+        timings = benchmark_incremental_edit(generate_program(300, seed=1), repeat=1)
+
+        assert set(timings) == {"update", "full"}
+        assert all(seconds > 0 for seconds in timings.values())
@@ -0,0 +1,82 @@
+import os
+import shutil
+
+import pytest
+
+from hack_assembler import __version__, main
+from hack_cache import AssemblyCache
+
+
+class TestAssemblyCache:
+    def test_hit_skips_assembly(self, tmp_path):
+        shutil.copy("translation_target/Add.asm", tmp_path / "Add.asm")
+        cache = AssemblyCache(str(tmp_path / "cache"), version=__version__)
+
+        first = main(str(tmp_path / "Add.asm"), cache=cache)
+        assert len(os.listdir(tmp_path / "cache")) == 1
+
+        # poison the entry- a hit must return it as-is rather than re-assembling
+        key = cache.key((tmp_path / "Add.asm").read_bytes())
+        cache.put(key, "1111111111111111\n")
+        second = main(str(tmp_path / "Add.asm"), cache=cache)
+
+        assert len(first) == 6
+        assert second == ["1111111111111111"]
+        assert (tmp_path / "Prog.hack").read_text() == "1111111111111111\n"
+
+    def test_version_is_part_of_key(self, tmp_path):
+        old = AssemblyCache(str(tmp_path), version="1.0.0")
+        new = AssemblyCache(str(tmp_path), version="1.1.0")
+        assert old.key(b"@2\n") != new.key(b"@2\n")
+        assert new.key(b"@2\n") != new.key(b"@3\n")
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = AssemblyCache(str(tmp_path), max_bytes=40)
+        cache.put("old", "0" * 17)
+        cache.put("used", "1" * 17)
+        os.utime(cache.entry_path("old"), (1, 1))
+        os.utime(cache.entry_path("used"), (2, 2))
+        assert cache.get("used") is not None  # bumps it to most recent
+
+        cache.put("new", "2" * 17)
+
+        assert cache.get("old") is None
+        assert cache.get("used") == "1" * 17
+        assert cache.get("new") == "2" * 17
+
+    def test_directory_listed_once_until_full(self, tmp_path, monkeypatch):
+        cache = AssemblyCache(str(tmp_path), max_bytes=600)
+        scans = []
+        scan = cache.scan
+        monkeypatch.setattr(cache, "scan", lambda: scans.append(1) or scan())
+
+        for index in range(30):
+            cache.put(f"entry{index}", "0" * 17)
+        assert len(scans) == 1
+
+        # past the limit, each eviction leaves room for several more writes
+        for index in range(30, 60):
+            cache.put(f"entry{index}", "0" * 17)
+        assert len(scans) < 10
+        assert sum(entry.stat().st_size for entry in os.scandir(tmp_path)) <= 600
+        assert cache.get("entry59") is not None
+
+    @pytest.mark.parametrize(
+        "source, lines",
+        [
+            (b"@1\nD=A", 2),
+            (b"@1\nD=A\n", 2),
+            (b"@1\rD=A\r", 2),
+            (b"@1\r\nD=A\r\n\n", 3),
+        ],
+    )
+    def test_hit_reports_same_line_count(self, tmp_path, source, lines):
+        (tmp_path / "Prog.asm").write_bytes(source)
+        cache = AssemblyCache(str(tmp_path / "cache"), version=__version__)
+
+        reports = []
+        for _ in range(2):
+            main(str(tmp_path / "Prog.asm"), cache=cache, on_stats=reports.append)
+
+        assert [report.cache_hit for report in reports] == [False, True]
+        assert [report.lines_read for report in reports] == [lines, lines]
@@ -0,0 +1,61 @@
+import io
+import json
+
+from hack_daemon import AssemblerService, serve_stdio
+
+
+def run_requests(service: AssemblerService, *requests) -> list[dict]:
+    input_stream = io.StringIO("".join(json.dumps(request) + "\n" for request in requests))
+    output_stream = io.StringIO()
+    serve_stdio(service, input_stream, output_stream)
+    return [json.loads(line) for line in output_stream.getvalue().splitlines()]
+
+
+class TestAssemblerService:
+    def test_source_and_path_requests(self):
+        with open("translation_target/Rect_test_expected.hack", "r") as expected_output_file:
+            expected_output_lines = expected_output_file.read().splitlines()
+        with open("translation_target/Rect.asm", "r") as file:
+            source = file.read()
+
+        service = AssemblerService()
+        by_source, by_path, ping = run_requests(
+            service,
+            {"id": 1, "source": source, "render": True},
+            {"id": 2, "path": "translation_target/Rect.asm"},
+            {"command": "ping"},
+        )
+
+        assert by_source == {"ok": True, "lines": expected_output_lines, "id": 1}
+        assert by_path["words"] == [int(line, 2) for line in expected_output_lines]
+        assert ping == {"ok": True}
+
+    def test_requests_dont_share_symbols(self):
+        service = AssemblerService()
+        first, second = run_requests(
+            service, {"source": "@first\n@shared"}, {"source": "@shared\n@first"}
+        )
+        assert first["words"] == [16, 17]
+        assert second["words"] == [16, 17]
+
+    def test_write_output(self, tmp_path):
+        output_path = tmp_path / "Add.hack"
+        (response,) = run_requests(
+            AssemblerService(),
+            {"path": "translation_target/Add.asm", "output": str(output_path)},
+        )
+        assert response == {"ok": True, "instructions": 6}
+        assert len(output_path.read_text().splitlines()) == 6
+
+    def test_errors_keep_the_server_running(self):
+        service = AssemblerService()
+        bad_json = service.handle_line("{not json")
+        bad_mnemonic, good = run_requests(
+            service, {"id": "x", "source": "D=Q"}, {"source": "@5"}
+        )
+
+        assert json.loads(bad_json)["ok"] is False
+        assert bad_mnemonic["ok"] is False
+        assert bad_mnemonic["id"] == "x"
+        assert "Q not found" in bad_mnemonic["error"]
+        assert good["words"] == [5]
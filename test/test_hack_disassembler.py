@@ -0,0 +1,82 @@
+import pytest
+
+from hack_assembler import (
+    assemble_source,
+    c_instruction_prefix,
+    comp_bits_dict,
+    encode_c_instruction,
+    render_words,
+    words_to_rom,
+    write_rom,
+)
+from hack_disassembler import cli, disassemble, disassemble_word
+
+
+class TestDisassembleWord:
+    def test_instructions(self):
+        assert disassemble_word(21) == "@21"
+        for instruction in ["D=D+A", "M=-1", "MD=M+1", "D;JGT", "0;JMP", "AMD=D|M;JNE"]:
+            assert disassemble_word(encode_c_instruction(instruction)) == instruction
+
+    def test_unknown_words(self):
+        # comp bits 0101011 aren't in the table, and 100 isn't a c-instruction prefix
+        assert disassemble_word(0b1110101011000000) is None
+        assert disassemble_word(0b1000101010000000) is None
+
+    def test_comp_without_dest_or_jump_is_unknown(self):
+        # the assembler needs an "=" or ";", so a bare comp like "0" can't be written
+        for bits in comp_bits_dict.values():
+            assert disassemble_word(c_instruction_prefix | bits) is None
+
+    def test_every_decoded_word_assembles_back(self):
+        words = [word for word in range(1 << 16) if disassemble_word(word) is not None]
+        source = [disassemble_word(word) for word in words]
+
+        assert assemble_source(source) == render_words(words)
+
+
+class TestDisassemble:
+    def test_hack_round_trip(self, tmp_path):
+        with open("translation_target/Pong_test_expected.hack", "r") as expected_output_file:
+            expected_output_lines = expected_output_file.read().splitlines()
+
+        output_path = tmp_path / "Pong.asm"
+        result = disassemble(
+            "translation_target/Pong_test_expected.hack", str(output_path), batch_size=1000
+        )
+
+        assert result.instructions == len(expected_output_lines)
+        assert result.unknown == []
+        assert assemble_source(output_path.read_text()) == expected_output_lines
+
+    @pytest.mark.parametrize("input_format, byteorder", [("rom-le", "little"), ("rom-be", "big")])
+    def test_rom_round_trip(self, tmp_path, input_format, byteorder):
+        words = [21, 16384, encode_c_instruction("D=M"), encode_c_instruction("0;JMP")]
+        rom_path = tmp_path / "Prog.bin"
+        write_rom(str(rom_path), words_to_rom(words), byteorder)
+
+        output_path = tmp_path / "Prog.asm"
+        disassemble(str(rom_path), str(output_path), input_format)
+
+        assert output_path.read_text().splitlines() == ["@21", "@16384", "D=M", "0;JMP"]
+
+    def test_unknown_words_reported(self, tmp_path, capsys):
+        hack_path = tmp_path / "Prog.hack"
+        hack_path.write_text("\n".join(render_words([1, 0b1110101011000000, 2])) + "\n")
+
+        assert cli([str(hack_path)]) == 1
+
+        captured = capsys.readouterr()
+        assert captured.out.splitlines() == [
+            "@1",
+            "// unknown instruction 1110101011000000 at 1",
+            "@2",
+        ]
+        assert "1 of 3 words couldn't be decoded, at 1" in captured.err
+
+    def test_bad_line(self, tmp_path):
+        hack_path = tmp_path / "Prog.hack"
+        hack_path.write_text("0000000000000001\n01\n")
+
+        with pytest.raises(ValueError, match="line 2"):
+            disassemble(str(hack_path), str(tmp_path / "Prog.asm"))
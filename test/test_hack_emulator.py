@@ -0,0 +1,59 @@
+import pytest
+
+from hack_assembler import main
+from hack_emulator import KBD, HackComputer, cli
+
+
+def load(tmp_path, name: str) -> HackComputer:
+    words = main(
+        f"translation_target/{name}.asm", str(tmp_path / f"{name}.bin"), output_format="rom-le"
+    )
+    return HackComputer(words)
+
+
+class TestHackComputer:
+    @pytest.mark.parametrize("r0, r1", [(7, 12), (12, 7), (-3, -5)])
+    def test_max(self, tmp_path, r0, r1):
+        computer = load(tmp_path, "Max")
+        computer.ram[0] = r0 & 0xFFFF
+        computer.ram[1] = r1 & 0xFFFF
+
+        computer.run()
+
+        assert computer.halted
+        assert computer.ram[2] == max(r0, r1) & 0xFFFF
+
+    def test_rect_draws_on_screen(self, tmp_path):
+        computer = load(tmp_path, "Rect")
+        computer.ram[0] = 4
+
+        computer.run()
+
+        pixels = computer.screen_pixels()
+        assert computer.halted
+        # a 16 pixel wide rectangle, R0 rows tall, in the top left corner
+        assert pixels[:4, :16].all()
+        assert pixels.sum() == 4 * 16
+
+    def test_cycle_limit_and_resume(self, tmp_path):
+        computer = load(tmp_path, "Pong")
+
+        assert computer.run(50_000) == 50_000
+        assert not computer.halted
+        computer.press_key(130)
+        assert computer.ram[KBD] == 130
+        assert computer.run(50_000) == 50_000
+        assert computer.cycles == 100_000
+        # still inside the VM's stack segment
+        assert 256 <= computer.ram[0] < 2048
+
+    def test_unknown_comp_rejected(self):
+        with pytest.raises(ValueError, match=r"ROM\[1\]: unknown comp bits"):
+            HackComputer([0, 0b1110101011000000])
+
+    def test_cli(self, tmp_path, capsys):
+        hack_path = tmp_path / "Max.hack"
+        main("translation_target/Max.asm", str(hack_path))
+
+        assert cli([str(hack_path), "--set", "0=3", "1=9", "--show", "0-2"]) == 0
+        assert capsys.readouterr().out.splitlines() == ["RAM[0] = 3", "RAM[1] = 9", "RAM[2] = 9"]
@@ -0,0 +1,88 @@
+import pytest
+
+from hack_assembler import assemble_words
+from hack_incremental import IncrementalProgram, TextEdit, diff_edits
+
+
+@pytest.fixture(scope="module")
+def pong_lines():
+    with open("translation_target/PongL.asm", "r") as file:
+        return file.read().splitlines()
+
+
+def assert_matches_full_assembly(program: IncrementalProgram):
+    expected = IncrementalProgram(program.source_lines)
+    assert program.words == expected.words
+    assert program.symbol_table == expected.symbol_table
+
+
+class TestIncrementalProgram:
+    def test_initial_assembly_matches_expected(self):
+        program = IncrementalProgram.from_file("translation_target/Pong.asm")
+
+        with open("translation_target/Pong_test_expected.hack", "r") as expected_output_file:
+            assert program.render() == expected_output_file.read().splitlines()
+
+    def test_same_length_edit(self, pong_lines):
+        program = IncrementalProgram(pong_lines)
+        program.apply_edit(100, 101, ["D=D+1"])
+        assert_matches_full_assembly(program)
+
+    def test_insert_moves_labels(self):
+        program = IncrementalProgram.from_file("translation_target/Pong.asm")
+        program.apply_edit(50, 50, ["@SP", "M=M+1", "// comment only", ""])
+        assert_matches_full_assembly(program)
+
+    def test_delete_moves_labels(self):
+        program = IncrementalProgram.from_file("translation_target/Pong.asm")
+        program.apply_edit(50, 60, [])
+        assert_matches_full_assembly(program)
+
+    def test_new_variable_renumbers_later_ones(self):
+        program = IncrementalProgram.from_file("translation_target/Rect.asm")
+        program.apply_edit(8, 8, ["@fresh", "M=0"])
+        assert program.symbol_table["fresh"] == 16
+        assert_matches_full_assembly(program)
+
+    def test_label_edit_reassembles(self):
+        program = IncrementalProgram.from_file("translation_target/Max.asm")
+        program.apply_edit(13, 13, ["(EXTRA)", "@EXTRA", "0;JMP"])
+        assert_matches_full_assembly(program)
+
+    def test_update_from_new_source(self):
+        with open("translation_target/Rect.asm", "r") as file:
+            old_lines = file.read().splitlines()
+        new_lines = list(old_lines)
+        new_lines[20:22] = ["@extra", "M=1", "D=A"]
+        del new_lines[5]
+
+        assert len(diff_edits(old_lines, new_lines)) == 2
+
+        program = IncrementalProgram(old_lines)
+        program.update(new_lines)
+        assert program.source_lines == new_lines
+        assert_matches_full_assembly(program)
+
+    def test_diff_only_looks_at_changed_window(self, pong_lines):
+        new_lines = list(pong_lines)
+        new_lines[20000:20001] = ["@SP", "D=M"]
+        assert diff_edits(pong_lines, new_lines) == [TextEdit(20000, 20001, ["@SP", "D=M"])]
+        assert diff_edits(pong_lines, list(pong_lines)) == []
+
+        # edits far apart leave a window too big to diff, which is replaced whole
+        del new_lines[30]
+        (edit,) = diff_edits(pong_lines, new_lines)
+        assert (edit.start, edit.end) == (30, 20001)
+
+        program = IncrementalProgram(pong_lines)
+        program.update(new_lines)
+        assert_matches_full_assembly(program)
+
+    def test_edit_near_the_top(self, pong_lines):
+        new_lines = list(pong_lines)
+        # an instruction near the top, so nearly every label moves- hack_benchmark times this
+        new_lines.insert(50, "@SP")
+
+        program = IncrementalProgram(pong_lines)
+        program.update(new_lines)
+        assert program.words == assemble_words(new_lines)
@@ -0,0 +1,66 @@
+import pytest
+
+from hack_linker import ObjectModule, assemble_object, build, cli, link, object_path
+
+
+def split_source(tmp_path, path: str, parts: int) -> list[str]:
+    with open(path, "r") as file:
+        source_lines = file.read().splitlines()
+
+    size = len(source_lines) // parts + 1
+    unit_paths = []
+    for part in range(parts):
+        unit_path = tmp_path / f"Unit{part}.asm"
+        unit_path.write_text("\n".join(source_lines[part * size : (part + 1) * size]) + "\n")
+        unit_paths.append(str(unit_path))
+    return unit_paths
+
+
+class TestLinker:
+    def test_linked_units_match_monolithic_assembly(self, tmp_path):
+        with open("translation_target/Pong_test_expected.hack", "r") as expected_output_file:
+            expected_output_lines = expected_output_file.read().splitlines()
+
+        unit_paths = split_source(tmp_path, "translation_target/Pong.asm", 3)
+        output_path = tmp_path / "Pong.hack"
+        result = build(unit_paths, str(output_path))
+
+        assert result.reassembled == unit_paths
+        assert output_path.read_text().splitlines() == expected_output_lines
+
+    def test_only_changed_units_reassembled(self, tmp_path):
+        unit_paths = split_source(tmp_path, "translation_target/Max.asm", 2)
+        output_path = str(tmp_path / "Max.hack")
+        build(unit_paths, output_path)
+
+        assert build(unit_paths, output_path).reassembled == []
+
+        with open(unit_paths[1], "a") as unit_file:
+            unit_file.write("@R5\n")
+        assert build(unit_paths, output_path).reassembled == [unit_paths[1]]
+
+    def test_object_modules_round_trip(self, tmp_path):
+        module = assemble_object(b"(START)\n@counter\nM=1\n@START\n0;JMP\n", "Loop.asm")
+
+        assert module.labels == {"START": 0}
+        assert module.relocations == [(0, "counter"), (2, "START")]
+
+        module.write(object_path(str(tmp_path / "Loop.asm")))
+        loaded = ObjectModule.read(str(tmp_path / "Loop.hackobj"))
+        assert loaded == module
+
+        # placed after a two instruction module, START moves to 2 and counter is the first variable
+        other = assemble_object(b"@counter\nD=M\n", "Other.asm")
+        assert link([other, loaded]) == [16, 0xFC10, 16, 0xEFC8, 2, 0xEA87]
+
+    def test_label_defined_twice(self):
+        modules = [assemble_object(b"(LOOP)\n@LOOP\n", f"Unit{part}.asm") for part in range(2)]
+
+        with pytest.raises(ValueError, match="'LOOP' defined in both Unit0.asm and Unit1.asm"):
+            link(modules)
+
+    def test_missing_unit_reported(self, tmp_path, capsys):
+        missing = tmp_path / "Missing.asm"
+
+        assert cli([str(missing), "-o", str(tmp_path / "Prog.hack")]) == 1
+        assert capsys.readouterr().err.startswith(f"error: [Errno 2] No such file or directory: '{missing}'")
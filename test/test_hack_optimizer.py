@@ -0,0 +1,97 @@
+import pytest
+
+from hack_assembler import (
+    SymbolTable,
+    allocate_variables,
+    main,
+    parse_program,
+    resolve_labels,
+    symbol_table_dict_original,
+)
+from hack_emulator import HackComputer
+from hack_optimizer import optimize_program
+
+
+def optimized_texts(source_lines: list[str]) -> tuple[list[str], int]:
+    program, removed = optimize_program(parse_program(source_lines))
+    return [inst.text for inst in program], removed
+
+
+class TestOptimizeProgram:
+    def test_push_pop_round_trip(self):
+        texts, removed = optimized_texts(
+            ["@SP", "AM=M+1", "A=A-1", "M=D", "@SP", "AM=M-1", "D=M", "@R13", "M=D"]
+        )
+
+        assert texts == ["@SP", "A=M", "M=D", "@R13", "M=D"]
+        assert removed == 4
+
+    def test_repeated_and_overwritten_loads(self):
+        texts, removed = optimized_texts(["@5", "D=A", "@5", "M=D", "@R1", "@R2", "D=M"])
+
+        assert texts == ["@5", "D=A", "M=D", "@R2", "D=M"]
+        assert removed == 2
+
+    def test_labels_start_a_new_block(self):
+        source_lines = ["@5", "D=A", "(LOOP)", "@5", "M=D", "@LOOP", "0;JMP"]
+
+        assert optimized_texts(source_lines) == (source_lines, 0)
+
+    def test_first_variable_reference_kept(self):
+        # @y is dead, but dropping it would give x address 16 instead of 17
+        source_lines = ["@y", "@x", "M=1", "@y", "@x", "M=D"]
+        texts, removed = optimized_texts(source_lines)
+
+        # later dead and repeated loads still go
+        assert texts == ["@y", "@x", "M=1", "M=D"]
+        assert removed == 2
+
+        program = parse_program(source_lines)
+        symbol_tables = []
+        for program in (program, optimize_program(program).program):
+            symbol_table = SymbolTable(symbol_table_dict_original)
+            allocate_variables(resolve_labels(program, symbol_table), symbol_table)
+            symbol_tables.append(symbol_table)
+        assert symbol_tables[0] == symbol_tables[1]
+
+    def test_jump_to_next_instruction(self):
+        texts, removed = optimized_texts(["@NEXT", "D;JGT", "(NEXT)", "@R0", "M=D"])
+
+        assert texts == ["(NEXT)", "@R0", "M=D"]
+        assert removed == 2
+
+    @pytest.mark.parametrize(
+        "name, ram",
+        [("Max", {0: 7, 1: 12}), ("Max", {0: 12, 1: 7}), ("Rect", {0: 5})],
+    )
+    def test_programs_behave_the_same(self, tmp_path, name, ram):
+        results = []
+        for optimize in (False, True):
+            words = main(
+                f"translation_target/{name}.asm",
+                str(tmp_path / f"{name}.bin"),
+                output_format="rom-le",
+                optimize=optimize,
+            )
+            computer = HackComputer(words)
+            for address, value in ram.items():
+                computer.ram[address] = value
+            computer.run()
+            assert computer.halted
+            results.append(computer.ram)
+
+        assert results[0] == results[1]
+
+    def test_pong_shrinks(self, tmp_path):
+        reports = []
+        words = main(
+            "translation_target/Pong.asm",
+            str(tmp_path / "Pong.hack"),
+            optimize=True,
+            on_stats=reports.append,
+        )
+
+        (stats,) = reports
+        assert stats.instructions_removed > 1000
+        assert len(words) == stats.a_instructions + stats.c_instructions
+        assert "optimize" in stats.phase_seconds
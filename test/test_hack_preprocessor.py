@@ -0,0 +1,115 @@
+import pytest
+
+from hack_assembler import assemble_source, main, split_lines
+from hack_cache import AssemblyCache
+import hack_preprocessor
+from hack_preprocessor import expand_macro, included_cache, preprocess
+
+runtime_library = """\
+// shared stack macros
+#macro PUSH_D
+    @SP
+    AM=M+1
+    A=A-1
+    M=D
+#end
+#macro PUSH_CONST value
+    @{value}   // constant
+    D=A
+    #PUSH_D
+#end
+"""
+
+
+class TestPreprocess:
+    def test_macros_and_includes(self, tmp_path):
+        (tmp_path / "runtime.asm").write_text(runtime_library)
+        main_path = tmp_path / "Main.asm"
+        main_path.write_text('#include "runtime.asm"\n#PUSH_CONST 7\n#PUSH_CONST 8  // again\n')
+
+        lines = preprocess(main_path.read_text(), str(main_path))
+
+        push = ["@SP", "AM=M+1", "A=A-1", "M=D"]
+        assert assemble_source(lines) == assemble_source(
+            ["@7", "D=A", *push, "@8", "D=A", *push]
+        )
+
+    def test_include_parsed_once_across_programs(self, tmp_path, monkeypatch):
+        (tmp_path / "runtime.asm").write_text(runtime_library)
+        included_cache.clear()
+        expand_macro.cache_clear()
+        parsed = []
+        parse_source = hack_preprocessor.parse_source
+
+        def counting_parse(source):
+            parsed.append(source)
+            return parse_source(source)
+
+        monkeypatch.setattr(hack_preprocessor, "parse_source", counting_parse)
+
+        for index in range(5):
+            program_path = tmp_path / f"Prog{index}.asm"
+            program_path.write_text('#include "runtime.asm"\n#PUSH_CONST 1\n')
+            preprocess(program_path.read_text(), str(program_path))
+
+        # each program, and the runtime once- only included files are kept
+        assert parsed.count(runtime_library) == 1
+        assert len(parsed) == 6
+        assert len(included_cache) == 1
+        assert expand_macro.cache_info().misses == 2
+
+    def test_diamond_include(self, tmp_path):
+        (tmp_path / "runtime.asm").write_text(runtime_library + "@RUNTIME\n")
+        (tmp_path / "Screen.asm").write_text('#include "runtime.asm"\n#PUSH_CONST 1\n')
+        (tmp_path / "Keyboard.asm").write_text('#include "./runtime.asm"\n#PUSH_CONST 2\n')
+        main_path = tmp_path / "Main.asm"
+        main_path.write_text('#include "Screen.asm"\n#include "Keyboard.asm"\n#PUSH_D\n')
+
+        lines = preprocess(main_path.read_text(), str(main_path))
+
+        # the runtime is pasted in once, by whichever file includes it first
+        push = ["@SP", "AM=M+1", "A=A-1", "M=D"]
+        assert assemble_source(lines) == assemble_source(
+            ["@RUNTIME", "@1", "D=A", *push, "@2", "D=A", *push, *push]
+        )
+
+    @pytest.mark.parametrize("source", ["D=\x0cA\n@1\x1c\n", "@1\rD=A\r\n@2\u2028\x85"])
+    def test_lines_split_like_the_assembler(self, source):
+        lines = preprocess(source)
+
+        assert lines == split_lines(source.rstrip("\n"))
+        assert assemble_source(lines) == assemble_source(source)
+
+    @pytest.mark.parametrize(
+        "source, message",
+        [
+            ("#PUSH_D\n", "Prog.asm:1: unknown directive or macro '#PUSH_D'"),
+            ("D=\x0bA\n#PUSH_D\n", "Prog.asm:2: unknown directive or macro '#PUSH_D'"),
+            ("#macro A x\n@{x}\n", "Prog.asm: line 1: #macro A has no #end"),
+            ("#macro A x\n@{x}\n#end\n#A\n", "Prog.asm:4: macro A takes 1 arguments, got 0"),
+            ('#include "Prog.asm"\n', "include cycle: Prog.asm -> Prog.asm"),
+        ],
+    )
+    def test_errors(self, tmp_path, monkeypatch, source, message):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "Prog.asm").write_text(source)
+
+        with pytest.raises(ValueError) as error:
+            preprocess(source, "Prog.asm")
+        assert str(error.value) == message
+
+    def test_main_preprocesses_and_caches_by_expanded_source(self, tmp_path):
+        (tmp_path / "runtime.asm").write_text(runtime_library)
+        main_path = tmp_path / "Main.asm"
+        main_path.write_text('#include "runtime.asm"\n#PUSH_CONST 7\n')
+        cache = AssemblyCache(str(tmp_path / "cache"))
+
+        reports = []
+        first = main(str(main_path), cache=cache, preprocess=True, on_stats=reports.append)
+        (tmp_path / "runtime.asm").write_text(runtime_library.replace("D=A", "D=-A"))
+        second = main(str(main_path), cache=cache, preprocess=True, on_stats=reports.append)
+
+        assert first[1] == assemble_source(["D=A"])[0]
+        assert second[1] == assemble_source(["D=-A"])[0]
+        assert not reports[1].cache_hit
+        assert "preprocess" in reports[0].phase_seconds
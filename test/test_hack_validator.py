@@ -0,0 +1,92 @@
+import glob
+import subprocess
+import sys
+
+import pytest
+
+from hack_assembler import cli, lex_buffer
+from hack_validator import validate_file, validate_program
+
+broken_program = """\
+// every kind of mistake, once
+@32768
+D=Q
+MX=D;JMPP
+D
+(LOOP)
+@1st
+(LOOP)
+(SP)
+(OPEN
+@LOOP
+0;JMP
+"""
+
+
+class TestValidateProgram:
+    @pytest.mark.parametrize("path", sorted(glob.glob("translation_target/*.asm")))
+    def test_bundled_programs_are_valid(self, path):
+        assert validate_file(path) == []
+
+    def test_every_error_reported_with_its_line(self):
+        errors = validate_program(lex_buffer(broken_program.encode()))
+
+        assert [(error.line_number, error.message) for error in errors] == [
+            (2, "constant 32768 is over 32767"),
+            (3, "unknown comp 'Q'"),
+            (4, "unknown dest 'MX'"),
+            (4, "unknown jump 'JMPP'"),
+            (5, "c-instruction lacks both '=' and ';'"),
+            (7, "symbol '1st' starts with a digit"),
+            (8, "label LOOP already defined on line 6"),
+            (9, "label SP is a predefined symbol"),
+            (10, "malformed label"),
+        ]
+        assert str(errors[1]) == "line 3: unknown comp 'Q' in 'D=Q'"
+
+    def test_cli_validate(self, tmp_path):
+        source_path = tmp_path / "Broken.asm"
+        source_path.write_text(broken_program)
+
+        completed = subprocess.run(
+            [sys.executable, "hack_assembler.py", str(source_path), "--validate"],
+            capture_output=True,
+        )
+
+        assert completed.returncode == 1
+        assert len(completed.stderr.decode().splitlines()) == 9
+        assert not (tmp_path / "Broken.hack").exists()
+
+    def test_validate_preprocessed(self, tmp_path, capsys):
+        (tmp_path / "lib.asm").write_text("#macro LOAD value\n@{value}\nD=Q\n#end\n")
+        source_path = tmp_path / "Main.asm"
+        source_path.write_text('#include "lib.asm"\n#LOAD 7\n#LOAD 99999\n')
+
+        # without expanding, the directives are just lines the validator doesn't know
+        assert len(validate_file(str(source_path))) == 3
+        # line numbers count lines of the expanded program
+        errors = validate_file(str(source_path), preprocess=True)
+        assert [(error.line_number, error.message) for error in errors] == [
+            (2, "unknown comp 'Q'"),
+            (3, "constant 99999 is over 32767"),
+            (4, "unknown comp 'Q'"),
+        ]
+
+        assert cli([str(source_path), "--validate", "--preprocess"]) == 1
+        assert len(capsys.readouterr().err.splitlines()) == 3
+
+        source_path.write_text("#LOAD 7\n")
+        assert cli([str(source_path), "--validate", "--preprocess"]) == 1
+        message = f"{source_path}:1: unknown directive or macro '#LOAD'"
+        assert capsys.readouterr().err == f"error: {message}\n"
+
+    @pytest.mark.parametrize(
+        "flags",
+        [["--output", "x.hack"], ["--format", "rom-le"], ["--stream"], ["--stats"], ["--optimize"]],
+    )
+    def test_validate_rejects_options_it_ignores(self, capsys, flags):
+        with pytest.raises(SystemExit) as exit_info:
+            cli(["translation_target/Add.asm", "--validate", *flags])
+
+        assert exit_info.value.code == 2
+        assert f"--validate can't be used with {flags[0]}" in capsys.readouterr().err